@@ -1,9 +1,29 @@
 import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Optional
 from spoon_ai.agents import ToolCallAgent
-from spoon_ai.tools.tool_manager import ToolManager
 from spoon_ai.chat import ChatBot
-from dynamic_tool_loader import load_tool
+from spoon_ai.schema import AgentState, Message, ToolCall
+from tool_registry import registry
 from generation_tool import GenerationTool, ReTool
+from turn_events import emit
+from tracing import span
+from llm_scheduler import llm_scheduler, USER_PRIORITY
+from memory_compaction import memory_compactor, estimate_tokens, starts_turn, turn_message_id
+
+# Budget for a single agent step (one LLM call plus the tools it picks, including tool
+# generation). Streamed turns are bounded only by this, not by an overall timeout.
+STEP_TIMEOUT = float(os.environ.get("OUROBOROS_STEP_TIMEOUT", "300"))
+
+@dataclass
+class TurnResult:
+    response: str
+    duration: float
+    step_timings: List[float] = field(default_factory=list)
+    new_tools: List[str] = field(default_factory=list)
+
 # adpative agent 
 class AdaptiveAgent(ToolCallAgent):
     name: str = "adaptive_agent"
@@ -23,18 +43,118 @@ class AdaptiveAgent(ToolCallAgent):
     max_steps: int = 10
 
     def __init__(self, llm: ChatBot):
-        tool_manager = ToolManager([])
+        tool_manager = registry.view()
         tool_manager.add_tool(GenerationTool(llm, tool_manager))
         tool_manager.add_tool(ReTool(llm, tool_manager))
         super().__init__(llm=llm, available_tools=tool_manager)
-        self._default_timeout = 300
+        self._default_timeout = STEP_TIMEOUT
+        self._turn_lock = asyncio.Lock()
+        self._step_timings: List[float] = []
+        self._published_before = 0
         self.initialize()
 
     def initialize(self):
+        # Generated tools are shared; only the first session in the process scans the disk.
         try:
-            for file in os.listdir("generated-tools"):
-                if file.endswith(".py"):
-                    load_tool(self.available_tools, os.path.join("generated-tools", file), file)
+            registry.load_all()
         except Exception as e:
             print(e)
             pass
+
+    @property
+    def busy(self) -> bool:
+        return self._turn_lock.locked()
+
+    def dump_memory(self) -> List[dict]:
+        return [m.model_dump(exclude_none=True) for m in self.memory.messages]
+
+    def load_memory(self, messages: List[dict]) -> None:
+        self.memory.messages = [Message(**m) for m in messages]
+
+    async def run(self, request: Optional[str] = None) -> str:
+        # The request is added here rather than by ToolCallAgent.run so it can be marked as
+        # the start of a turn, which compaction and tool focus go by. A busy agent is left
+        # for the base class to reject.
+        if request is not None and self.state == AgentState.IDLE:
+            await self.add_message("user", request)
+            self.memory.messages[-1].id = turn_message_id()
+            request = None
+        return await super().run(request)
+
+    async def step(self, run_id=None) -> str:
+        start = time.perf_counter()
+        emit("step_start", step=self.current_step)
+        try:
+            with span("agent.step"):
+                return await super().step()
+        finally:
+            self._step_timings.append(time.perf_counter() - start)
+            emit("step_end", step=self.current_step, seconds=self._step_timings[-1])
+
+    def compact_memory(self) -> None:
+        messages = memory_compactor.compact(self.memory.messages)
+        if messages is not self.memory.messages:
+            self.memory.messages = messages
+            emit("memory_compacted", messages=len(messages), tokens=estimate_tokens(messages))
+
+    def focus_tools(self) -> None:
+        # Offer the generated tools relevant to this turn rather than all of them. Tools
+        # already used in the conversation or generated this turn are always offered.
+        messages = self.memory.messages
+        start = max((i for i, m in enumerate(messages) if starts_turn(m)), default=0)
+        query = " ".join(m.content or "" for m in messages[start:])
+        pinned = [m.name for m in messages if m.role == "tool" and m.name]
+        pinned += self.available_tools.published[self._published_before:]
+        self.available_tools.focus(query, pinned)
+
+    async def think(self) -> bool:
+        # Keep the history within budget before it is sent again.
+        self.compact_memory()
+        self.focus_tools()
+        # think() is the tool-selecting LLM call plus bookkeeping around it.
+        async with llm_scheduler.slot(self.llm, USER_PRIORITY):
+            with span("llm.ask_tool", agent=self.name):
+                should_act = await super().think()
+        if getattr(self, "_finish_reason_terminated", False):
+            emit("answer", content=self._final_response_content)
+        else:
+            last = self.memory.messages[-1] if self.memory.messages else None
+            emit(
+                "thinking",
+                content=last.content if last is not None and last.role == "assistant" else None,
+                tool_calls=[call.function.name for call in self.tool_calls or []],
+            )
+        return should_act
+
+    async def execute_tool(self, tool_call: ToolCall) -> str:
+        name = tool_call.function.name
+        emit("tool_start", tool=name, arguments=tool_call.function.arguments)
+        start = time.perf_counter()
+        result = await super().execute_tool(tool_call)
+        emit("tool_end", tool=name, seconds=time.perf_counter() - start, result=str(result)[:500])
+        return result
+
+    async def run_turn(self, message: str, timeout: float = None) -> TurnResult:
+        """
+        Runs a single agent loop for one user message and reports what that run did.
+        Turns on the same agent are serialized so timings and tool deltas never mix.
+        """
+        async with self._turn_lock:
+            tools_before = set(self.available_tools.tool_map)
+            published_before = self._published_before = len(self.available_tools.published)
+            self._step_timings = []
+            start = time.perf_counter()
+            response = await asyncio.wait_for(self.run(message), timeout=timeout)
+            duration = time.perf_counter() - start
+            # Tools other sessions publish meanwhile also show up in tool_map, so only
+            # count the ones this run generated.
+            new_tools = []
+            for n in self.available_tools.published[published_before:]:
+                if n not in tools_before and n not in new_tools:
+                    new_tools.append(n)
+            return TurnResult(
+                response=str(response),
+                duration=duration,
+                step_timings=list(self._step_timings),
+                new_tools=new_tools,
+            )
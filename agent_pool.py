@@ -0,0 +1,73 @@
+import os
+import asyncio
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# Ready-built agents kept for new sessions; 0 builds every agent on the request path.
+AGENT_POOL_SIZE = int(os.environ.get("OUROBOROS_AGENT_POOL", "4"))
+
+class AgentPool:
+    """
+    Agents built ahead of time for new sessions. take() hands one out in O(1) and wakes
+    a background task that builds the replacement in a worker thread; if the pool has
+    run dry the caller's agent is built in a worker thread too. Agents see the shared tool registry live, so
+    pooled ones never go stale as tools are generated.
+    """
+    def __init__(self, factory: Callable[[], object], size: int = AGENT_POOL_SIZE):
+        self.factory = factory
+        self.size = size
+        self._ready: deque = deque()
+        self._wanted: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "built": 0, "errors": 0}
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    async def take(self):
+        if self._wanted is not None:
+            self._wanted.set()
+        try:
+            agent = self._ready.popleft()
+            self.stats["hits"] += 1
+        except IndexError:
+            self.stats["misses"] += 1
+            agent = await asyncio.to_thread(self.factory)
+        return agent
+
+    async def fill(self) -> None:
+        while len(self._ready) < self.size:
+            try:
+                agent = await asyncio.to_thread(self.factory)
+            except Exception as e:
+                # Typically configuration (e.g. a missing API key); wait for the next take().
+                self.stats["errors"] += 1
+                print(f"Failed to build pooled agent: {e}")
+                return
+            self._ready.append(agent)
+            self.stats["built"] += 1
+
+    def start(self) -> None:
+        if self.size > 0 and self._task is None:
+            self._wanted = asyncio.Event()
+            self._wanted.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wanted = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            await self.fill()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "ready": len(self._ready), "size": self.size}
@@ -0,0 +1,94 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Tuple
+from llm_scheduler import llm_scheduler
+
+# Items of one /chat/batch request run at most this many at a time.
+BATCH_CONCURRENCY = int(os.environ.get("OUROBOROS_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.environ.get("OUROBOROS_BATCH_MAX_ITEMS", "256"))
+# Exact-match cache of answers to stateless prompts; off unless a TTL is set.
+RESPONSE_CACHE_TTL = float(os.environ.get("OUROBOROS_RESPONSE_CACHE_TTL", "0"))
+RESPONSE_CACHE_SIZE = int(os.environ.get("OUROBOROS_RESPONSE_CACHE_SIZE", "1024"))
+
+class StatelessRunner:
+    """
+    Runs session-independent prompts on a small set of agents kept for them and cleared
+    between runs, so batches don't drain the session agent pool. Identical prompts in
+    flight at the same time share one agent run, and finished answers can be served
+    from an exact-match cache. run() returns the TurnResult and how it was obtained:
+    "run", "coalesced" or "cached". `llm` is the LLM the agents use, checked for
+    admission before one is built.
+    """
+    def __init__(self, factory: Callable[[], Awaitable[object]], llm: object, ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_SIZE, keep_agents: int = BATCH_CONCURRENCY):
+        self.factory = factory
+        self.llm = llm
+        self.keep_agents = keep_agents
+        self._agents: List[object] = []
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # message -> (expires_at, TurnResult), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"runs": 0, "coalesced": 0, "cache_hits": 0, "cache_misses": 0, "failures": 0,
+                                      "agents_reused": 0}
+
+    def _cached(self, message: str):
+        entry = self._cache.get(message)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._cache[message]
+            return None
+        self._cache.move_to_end(message)
+        return entry[1]
+
+    def _store(self, message: str, task: asyncio.Task) -> None:
+        self._inflight.pop(message, None)
+        if task.cancelled() or task.exception() is not None:
+            self.stats["failures"] += 1
+            return
+        if self.ttl > 0:
+            self._cache[message] = (time.monotonic() + self.ttl, task.result())
+            self._cache.move_to_end(message)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def _run(self, message: str, timeout: float):
+        llm_scheduler.admit(self.llm)
+        if self._agents:
+            agent = self._agents.pop()
+            self.stats["agents_reused"] += 1
+        else:
+            agent = await self.factory()
+        try:
+            return await agent.run_turn(message, timeout=timeout)
+        finally:
+            # Memory, pending tool calls and step count go; the shared tool view stays.
+            agent.clear()
+            if len(self._agents) < self.keep_agents:
+                self._agents.append(agent)
+
+    async def run(self, message: str, timeout: float = None, use_cache: bool = True) -> Tuple[object, str]:
+        if self.ttl > 0 and use_cache:
+            result = self._cached(message)
+            if result is not None:
+                self.stats["cache_hits"] += 1
+                return result, "cached"
+            self.stats["cache_misses"] += 1
+        task = self._inflight.get(message)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            how = "coalesced"
+        else:
+            self.stats["runs"] += 1
+            how = "run"
+            task = self._inflight[message] = asyncio.create_task(self._run(message, timeout))
+            task.add_done_callback(lambda done: self._store(message, done))
+        # Shielded, so one waiter giving up does not cancel the run the others share.
+        return await asyncio.shield(task), how
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "inflight": len(self._inflight), "cached": len(self._cache), "agents": len(self._agents)}
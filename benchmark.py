@@ -0,0 +1,446 @@
+"""
+Offline benchmarks for the agent pipeline. ChatBot is replaced by FakeChatBot, a scripted
+stub with configurable latency, so runs are repeatable and need no API key.
+
+    python benchmark.py [--sessions 8] [--turns 5] [--latency 0.05] [--out results.json]
+
+Results go to stdout (and --out) as JSON; everything the app and its worker processes
+print goes to stderr.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Dict, List
+from spoon_ai.chat import ChatBot
+from spoon_ai.schema import LLMResponse, ToolCall, Function
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+CODE = '''```python
+def count(text, letter):
+    return text.count(letter)
+
+async def run(text, letter):
+    return count(text, letter)
+# install modules:
+```'''
+INPUTS = "text: str, letter: str"
+
+class FakeChatBot(ChatBot):
+    """
+    Scripted ChatBot. ask_tool() plays one list of (tool, arguments) calls per turn and
+    then answers; the last turn's script repeats. ask() returns code_replies in order,
+    repeating the last one. Every call waits `latency` seconds first.
+    """
+    def __init__(self, turns: List[List[tuple]] = (), code_replies: List[str] = (CODE,),
+                 answer: str = "done", latency: float = 0.0):
+        # ChatBot.__init__ loads provider config, none of which a stub needs.
+        self.turns = [list(turn) for turn in turns] or [[]]
+        self.script = list(self.turns[0])
+        self.code_replies = list(code_replies)
+        self.answer = answer
+        self.latency = latency
+        self.calls = 0
+
+    async def ask(self, messages, system_msg=None, output_queue=None, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self.code_replies.pop(0) if len(self.code_replies) > 1 else self.code_replies[0]
+
+    async def ask_tool(self, messages, system_msg=None, tools=None, tool_choice=None, output_queue=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.script:
+            name, arguments = self.script.pop(0)
+            call = ToolCall(id=f"call_{self.calls}", function=Function(name=name, arguments=json.dumps(arguments)))
+            return LLMResponse(content="", tool_calls=[call])
+        if len(self.turns) > 1:
+            self.turns.pop(0)
+        self.script = list(self.turns[0])
+        return LLMResponse(content=self.answer, finish_reason="stop", native_finish_reason="stop")
+
+def generation_call(name: str, class_name: str, description: str = "Counts how often a letter occurs in a text") -> tuple:
+    return ("generation_tool", {
+        "name": name, "description": description, "inputs": INPUTS, "outputs": "n: int", "class_name": class_name,
+    })
+
+# First turn of a session generates a tool and uses it; later turns just use it.
+CHAT_SCRIPT = [[generation_call("count", "CountTool"), ("count", {"text": "banana", "letter": "a"})],
+               [("count", {"text": "banana", "letter": "n"})]]
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+async def bench_chat(sessions: int, turns: int, latency: float) -> dict:
+    """
+    /chat throughput and latency with `sessions` concurrent sessions of `turns` requests each.
+    The first turn of every session generates a tool (one generation, the rest hit the cache).
+    """
+    import httpx
+    import main as server
+    from adaptive_agent import AdaptiveAgent
+
+    server.agent_pool.factory = lambda: AdaptiveAgent(FakeChatBot(CHAT_SCRIPT, latency=latency))
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def session(client, index: int):
+        nonlocal errors
+        for turn in range(turns):
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"message": f"turn {turn}", "session_id": f"bench-{index}"})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(session(client, i) for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": summarize(latencies),
+        "generation": server.generation_cache.snapshot(),
+    }
+
+def _serve(port: int, latency: float) -> None:
+    # Runs in its own process; stdout is kept for the results.
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    os.environ["OUROBOROS_SHARED_SESSIONS"] = "1"
+    os.environ["OUROBOROS_TOOL_POLL"] = "0.5"
+    import uvicorn
+    import main as server
+    from adaptive_agent import AdaptiveAgent
+    server.agent_pool.factory = lambda: AdaptiveAgent(FakeChatBot(CHAT_SCRIPT, latency=latency))
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def bench_workers(worker_counts: List[int], sessions: int, turns: int, latency: float) -> List[dict]:
+    """
+    /chat throughput against the number of worker processes. Each session's turns rotate
+    across the workers, so every turn after the first depends on the shared session store
+    and on tools another worker generated.
+    """
+    import httpx
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for count in worker_counts:
+        ports = [free_port() for _ in range(count)]
+        workers = [context.Process(target=_serve, args=(port, latency), daemon=True) for port in ports]
+        for worker in workers:
+            worker.start()
+        try:
+            async with httpx.AsyncClient(timeout=None) as client:
+                for port in ports:
+                    for _ in range(600):
+                        try:
+                            if (await client.get(f"http://127.0.0.1:{port}/health")).status_code == 200:
+                                break
+                        except httpx.TransportError:
+                            pass
+                        await asyncio.sleep(0.1)
+                    else:
+                        raise RuntimeError(f"worker on port {port} did not start")
+
+                latencies: List[float] = []
+                errors = 0
+
+                async def session(index: int):
+                    nonlocal errors
+                    for turn in range(turns):
+                        port = ports[(index + turn) % count]
+                        start = time.perf_counter()
+                        response = await client.post(f"http://127.0.0.1:{port}/chat", json={
+                            "message": f"turn {turn}", "session_id": f"workers-{count}-{index}",
+                        })
+                        latencies.append(time.perf_counter() - start)
+                        if response.status_code != 200:
+                            errors += 1
+
+                start = time.perf_counter()
+                await asyncio.gather(*(session(i) for i in range(sessions)))
+                elapsed = time.perf_counter() - start
+                stats = [(await client.get(f"http://127.0.0.1:{port}/stats/sessions")).json() for port in ports]
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+        results.append({
+            "workers": count,
+            "requests": len(latencies),
+            "errors": errors,
+            "seconds": elapsed,
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+            "latency": summarize(latencies),
+            "sessions_resynced": sum(s["resynced"] + s["rehydrated"] for s in stats),
+        })
+    return results
+
+def write_tools(tools_dir: str, count: int) -> None:
+    from generation_tool import gen_code
+    os.makedirs(tools_dir, exist_ok=True)
+    for i in range(count):
+        code = gen_code(CODE, INPUTS, f"CountTool{i}", f"count_{i}", f"Counts letters, variant {i}")
+        with open(os.path.join(tools_dir, f"CountTool{i}.py"), "w", encoding="utf-8") as f:
+            f.write(code)
+
+def bench_session_creation(tool_counts: List[int]) -> List[dict]:
+    """
+    Cost of discovering generated-tools (cold, from the index, and eager imports) and of
+    creating an agent, against the number of tool files.
+    """
+    import adaptive_agent
+    from tool_registry import ToolRegistry
+    results = []
+    for count in tool_counts:
+        tools_dir = os.path.abspath(f"tools-{count}")
+        write_tools(tools_dir, count)
+
+        registry = ToolRegistry(tools_dir, lazy=True)
+        start = time.perf_counter()
+        registry.load_all()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        ToolRegistry(tools_dir, lazy=True).load_all()
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        ToolRegistry(tools_dir, lazy=False).load_all()
+        eager = time.perf_counter() - start
+
+        shared, adaptive_agent.registry = adaptive_agent.registry, registry
+        try:
+            create = timed(lambda: adaptive_agent.AdaptiveAgent(FakeChatBot()), 5)
+        finally:
+            adaptive_agent.registry = shared
+        results.append({
+            "tools": count,
+            "scan_cold_seconds": cold,
+            "scan_indexed_seconds": indexed,
+            "scan_eager_seconds": eager,
+            "agent_create_seconds": create,
+        })
+    return results
+
+COLD_START = '''
+import sys, time
+sys.path.insert(0, {root!r})
+from tool_registry import ToolRegistry
+start = time.perf_counter()
+ToolRegistry({tools_dir!r}, lazy=False).load_all()
+print(time.perf_counter() - start)
+'''
+
+def bench_cold_start(tool_counts: List[int]) -> List[dict]:
+    """
+    Time a fresh process takes to import every generated tool (as eager loading and the
+    process executor's workers do): compiling from source, filling the bytecode cache,
+    and reading it back.
+    """
+    results = []
+    for count in tool_counts:
+        tools_dir = os.path.abspath(f"tools-{count}")
+        write_tools(tools_dir, count)
+        script = COLD_START.format(root=ROOT, tools_dir=tools_dir)
+
+        def start(**env) -> float:
+            out = subprocess.run([sys.executable, "-c", script], env={**os.environ, **env},
+                                 capture_output=True, text=True, check=True)
+            return float(out.stdout.strip().splitlines()[-1])
+
+        cache_dir = os.path.abspath(f"bytecode-{count}")
+        results.append({
+            "tools": count,
+            "compile_seconds": start(OUROBOROS_BYTECODE_CACHE="0", PYTHONDONTWRITEBYTECODE="1"),
+            "cache_cold_seconds": start(OUROBOROS_BYTECODE_DIR=cache_dir),
+            "cache_warm_seconds": start(OUROBOROS_BYTECODE_DIR=cache_dir),
+        })
+    return results
+
+def bench_codegen(repeat: int) -> dict:
+    """
+    Per-call cost of gen_code, importing a generated module and registering it lazily.
+    """
+    from generation_tool import gen_code
+    from dynamic_tool_loader import load_module, read_tool_specs
+    tools_dir = os.path.abspath("tools-codegen")
+    write_tools(tools_dir, 1)
+    path = os.path.join(tools_dir, "CountTool0.py")
+    return {
+        "gen_code_seconds": timed(lambda: gen_code(CODE, INPUTS, "CountTool", "count", "Counts letters"), repeat),
+        "load_module_seconds": timed(lambda: load_module(path, path), repeat),
+        "read_tool_specs_seconds": timed(lambda: read_tool_specs(path), repeat),
+    }
+
+async def bench_executor(repeat: int) -> dict:
+    """
+    Latency of generated-tool calls and import checks in the process executor: the
+    first call on a cold pool (fork server and worker start), warm calls, and calls
+    that land on a freshly recycled worker.
+    """
+    from tool_executor import ToolExecutor
+    from dynamic_tool_loader import load_module, instantiate_tools
+    tools_dir = os.path.abspath("tools-executor")
+    write_tools(tools_dir, 1)
+    path = os.path.join(tools_dir, "CountTool0.py")
+    tool = instantiate_tools(load_module(path, path))[0]
+    kwargs = {"text": "banana", "letter": "a"}
+
+    async def call_seconds(executor, run) -> float:
+        start = time.perf_counter()
+        await run(executor)
+        return time.perf_counter() - start
+
+    call = lambda executor: executor.run(tool, kwargs)
+    executor = ToolExecutor(mode="process", size=1)
+    try:
+        first = await call_seconds(executor, call)
+        warm = [await call_seconds(executor, call) for _ in range(repeat)]
+        checks = [await call_seconds(executor, lambda e: e.check(path)) for _ in range(repeat)]
+    finally:
+        executor.shutdown()
+    # max_calls=1 recycles the worker after every call, so each call starts a new one.
+    recycling = ToolExecutor(mode="process", size=1, max_calls=1)
+    try:
+        await recycling.warm()
+        recycled = [await call_seconds(recycling, call) for _ in range(min(repeat, 10))]
+    finally:
+        recycling.shutdown()
+    return {
+        "first_call_seconds": first,
+        "warm_call": summarize(warm),
+        "check": summarize(checks),
+        "recycled_call": summarize(recycled),
+    }
+
+RETRY_SCENARIOS = {
+    "clean": [CODE],
+    "fenced_with_prose": ["Here is the tool:\n" + CODE + "\nLet me know if you need changes."],
+    "truncated_last_line": [CODE.replace("# install modules:", "print(count(")],
+    "syntax_error_then_fixed": ["```python\ndef count(text, letter:\n    return 0\n```", CODE],
+    "always_broken": ["```python\ndef count(text, letter:\n```"],
+}
+
+async def bench_retries(latency: float) -> List[dict]:
+    """
+    LLM calls and time one generation takes when the model's code needs fixing.
+    """
+    from tool_registry import registry
+    from generation_tool import GenerationTool
+    from code_repair import code_repair
+    results = []
+    for scenario, replies in RETRY_SCENARIOS.items():
+        bot = FakeChatBot(code_replies=replies, latency=latency)
+        tool = GenerationTool(bot, registry.view())
+        avoided = code_repair.stats["retries_avoided"]
+        start = time.perf_counter()
+        # A distinct description per scenario keeps the generation cache out of it.
+        result = await tool.execute(f"tool_{scenario}", f"Counts letters ({scenario})", INPUTS, "n: int",
+                                    f"Retry{scenario.title().replace('_', '')}Tool")
+        results.append({
+            "scenario": scenario,
+            "succeeded": result.startswith("Successfully"),
+            "llm_calls": bot.calls,
+            "retries_avoided": code_repair.stats["retries_avoided"] - avoided,
+            "seconds": time.perf_counter() - start,
+        })
+    return results
+
+async def run_all(args) -> dict:
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "execution": args.execution,
+            "started": time.time(),
+        },
+    }
+    results["codegen"] = bench_codegen(args.repeat)
+    results["session_creation"] = bench_session_creation(args.tool_counts)
+    results["cold_start"] = bench_cold_start(args.tool_counts)
+    results["executor"] = await bench_executor(args.repeat)
+    results["retries"] = await bench_retries(args.latency)
+    results["chat"] = await bench_chat(args.sessions, args.turns, args.latency)
+    results["workers"] = await bench_workers(args.workers, args.sessions, args.turns, args.latency)
+    from tool_executor import executor
+    executor.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent /chat sessions")
+    parser.add_argument("--turns", type=int, default=5, help="requests per session")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--tool-counts", type=lambda s: [int(n) for n in s.split(",")], default=[0, 10, 50, 100])
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=[1, 2, 4],
+                        help="worker process counts for the scaling run")
+    parser.add_argument("--repeat", type=int, default=100, help="iterations for micro-benchmarks")
+    parser.add_argument("--execution", default="process", choices=("inline", "thread", "process"),
+                        help="how generated tools run (OUROBOROS_TOOL_EXECUTION)")
+    parser.add_argument("--out", help="also write the results to this file")
+    args = parser.parse_args()
+    out = os.path.abspath(args.out) if args.out else None
+
+    # Everything the app writes (tools, caches, sessions.db) is relative to the working dir.
+    os.chdir(tempfile.mkdtemp(prefix="ouroboros-bench-"))
+    os.environ["OUROBOROS_TOOL_EXECUTION"] = args.execution
+    os.environ["OUROBOROS_TOOL_POLL"] = "0"
+
+    # Redirected at the descriptor so tool worker processes, which inherit it, follow too.
+    sys.stdout.flush()
+    stdout = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        results = asyncio.run(run_all(args))
+    finally:
+        sys.stdout.flush()
+        os.dup2(stdout, 1)
+        os.close(stdout)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
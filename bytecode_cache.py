@@ -0,0 +1,134 @@
+import os
+import sys
+import types
+import marshal
+import hashlib
+import threading
+import importlib.util
+import importlib.machinery
+from typing import Dict, Optional
+
+# Compiled generated-tool modules are kept here, keyed by source hash and interpreter,
+# so every worker and restart reuses them; set OUROBOROS_BYTECODE_CACHE=0 to always compile.
+BYTECODE_CACHE = os.environ.get("OUROBOROS_BYTECODE_CACHE", "1") != "0"
+BYTECODE_DIR = os.environ.get("OUROBOROS_BYTECODE_DIR", os.path.join(os.getcwd(), "generated-tools", ".bytecode"))
+# Different Python versions produce incompatible bytecode; both go into the key.
+CACHE_TAG = sys.implementation.cache_tag or "python"
+HEADER = importlib.util.MAGIC_NUMBER
+
+class BytecodeCache:
+    """
+    Store of compiled tool modules, one directory per tool file holding an entry per
+    source version. Unlike __pycache__, entries are keyed by the source's sha256 rather
+    than its mtime, so a file rewritten within the same second is never served stale
+    code, and the store can sit anywhere all workers see.
+    """
+    def __init__(self, directory: str = BYTECODE_DIR, enabled: bool = BYTECODE_CACHE):
+        self.directory = directory
+        self.enabled = enabled
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "invalidated": 0, "errors": 0}
+
+    def _dir(self, source_path: str) -> str:
+        source_path = os.path.abspath(source_path)
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        return os.path.join(self.directory, f"{stem}-{hashlib.sha1(source_path.encode()).hexdigest()[:8]}")
+
+    def path(self, source_path: str, digest: str) -> str:
+        return os.path.join(self._dir(source_path), f"{digest}.{CACHE_TAG}.pyc")
+
+    def _read(self, target: str) -> Optional[types.CodeType]:
+        try:
+            with open(target, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if not data.startswith(HEADER):
+            return None
+        try:
+            return marshal.loads(data[len(HEADER):])
+        except (EOFError, ValueError, TypeError):
+            self.stats["errors"] += 1
+            return None
+
+    def _write(self, target: str, code: types.CodeType) -> None:
+        # Workers may compile the same file at once; each writes its own temp file and
+        # the rename makes whichever lands last the (identical) winner.
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER + marshal.dumps(code))
+            os.replace(tmp_path, target)
+            self.stats["writes"] += 1
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"Failed to cache bytecode at {target}: {e}")
+
+    def code(self, source: bytes, source_path: str) -> types.CodeType:
+        """
+        Code object for a module's source, compiled at most once per source version.
+        """
+        if not self.enabled:
+            return compile(source, source_path, "exec", dont_inherit=True)
+        target = self.path(source_path, hashlib.sha256(source).hexdigest())
+        code = self._read(target)
+        if code is not None:
+            self.stats["hits"] += 1
+            return code
+        self.stats["misses"] += 1
+        code = compile(source, source_path, "exec", dont_inherit=True)
+        self._write(target, code)
+        return code
+
+    def store(self, source_path: str) -> None:
+        """
+        Compiles a freshly written tool file ahead of its first import and drops the
+        entries of the versions it replaced.
+        """
+        if not self.enabled:
+            return
+        try:
+            with open(source_path, "rb") as f:
+                source = f.read()
+            self.code(source, source_path)
+        except (OSError, SyntaxError, ValueError) as e:
+            print(f"Failed to precompile {source_path}: {e}")
+            return
+        self.invalidate(source_path, keep=hashlib.sha256(source).hexdigest())
+
+    def invalidate(self, source_path: str, keep: Optional[str] = None) -> None:
+        keep_name = os.path.basename(self.path(source_path, keep)) if keep else None
+        directory = self._dir(source_path)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            if name != keep_name and name.endswith(".pyc"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                    self.stats["invalidated"] += 1
+                except OSError:
+                    pass
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "enabled": int(self.enabled)}
+
+bytecode_cache = BytecodeCache()
+
+class CachedSourceLoader(importlib.machinery.SourceFileLoader):
+    """
+    SourceFileLoader that takes its code from bytecode_cache instead of __pycache__.
+    With cache=False (throwaway files such as import checks) it compiles without
+    writing bytecode anywhere.
+    """
+    def __init__(self, fullname, path, cache: bool = True):
+        super().__init__(fullname, path)
+        self.cache = cache
+
+    def get_code(self, fullname):
+        if not self.cache:
+            return compile(self.get_data(self.path), self.path, "exec", dont_inherit=True)
+        if not bytecode_cache.enabled:
+            return super().get_code(fullname)
+        return bytecode_cache.code(self.get_data(self.path), self.path)
@@ -0,0 +1,57 @@
+import os
+from spoon_ai.agents.base import BaseAgent
+from spoon_ai.schema import AgentState
+from speculation import SPECULATIVE_CANDIDATES, speculative_step, validate_candidate
+from code_repair import code_repair
+from tracing import span
+from llm_scheduler import llm_scheduler, BACKGROUND_PRIORITY
+
+# Budget for a whole generation run. BaseAgent gives each step timeout / max_steps (capped
+# at 30s), and a step here is an LLM call plus compiling and smoke-importing its drafts.
+GENERATION_TIMEOUT = float(os.environ.get("OUROBOROS_GENERATION_TIMEOUT", "150"))
+
+class CodeGenerationAgent(BaseAgent):
+    """
+    Base of ToolGenerationAgent and RetoolAgent: each step asks the LLM for code and
+    finishes once a reply compiles (and imports, given assemble), feeding errors back to
+    the model otherwise. The code of the last step is left in `code`.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.max_steps=5
+        self._default_timeout = GENERATION_TIMEOUT
+        self.llm_calls = 0
+        # Drafts requested concurrently per step, and an optional raw -> full tool module
+        # function the caller sets so drafts can be smoke-imported before one is accepted.
+        self.candidates = SPECULATIVE_CANDIDATES
+        self.assemble = None
+        self.code = ""
+
+    async def run(self, request=None, timeout=None) -> str:
+        self.code = ""
+        return await super().run(request, timeout)
+
+    async def _ask(self) -> str:
+        # Counted up front: a draft cancelled mid-flight was still paid for.
+        self.llm_calls += 1
+        # Tool generation yields to user-facing calls when the LLM is saturated.
+        async with llm_scheduler.slot(self.llm, BACKGROUND_PRIORITY):
+            with span("llm.ask", agent=self.name):
+                reply = await self.llm.ask(system_msg = self.system_prompt, messages = self.memory.messages)
+        # Fences, stray prose and the like are fixed here rather than by another LLM call.
+        return code_repair.repair(reply)
+
+    async def step(self, run_id=None) -> str:
+        if self.candidates > 1:
+            return await speculative_step(self, self._ask)
+        reply = self.code = await self._ask()
+
+        await self.add_message("assistant", reply)
+
+        with span("validate"):
+            errorMsg = await validate_candidate(reply, self.assemble)
+        if errorMsg is None:
+            self.state = AgentState.FINISHED
+            return reply
+        await self.add_message("tool", errorMsg)
+        return reply + '\n' + errorMsg
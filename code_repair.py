@@ -0,0 +1,138 @@
+import re
+import ast
+from typing import Callable, Dict, List, Optional, Tuple
+
+FENCE_RE = re.compile(r"```[ \t]*(?:python3?|py)?[ \t]*\n?([\s\S]*?)(?:```|$)", re.IGNORECASE)
+# Unindented lines that start Python code; anything else at column 0 around the code is prose.
+CODE_LINE_RE = re.compile(
+    r"^(import\s|from\s|def\s|async\s+def\s|class\s|@|#|if\s|for\s|while\s|try:|with\s|return\b|"
+    r"[A-Za-z_][\w.]*\s*(=|\(|\[)|[\])}]|\"\"\"|''')"
+)
+IMPORT_RE = re.compile(r"^(import\s+.+|from\s+\S+\s+import\s+.+)$")
+# How many final lines may be dropped as truncated output; more risks cutting real code.
+MAX_TRUNCATED_LINES = 1
+
+def syntax_error(code: str) -> Optional[SyntaxError]:
+    try:
+        compile(code, "<string>", "exec")
+    except SyntaxError as e:
+        return e
+    return None
+
+def _extract_code(text: str) -> str:
+    blocks = [block for block in FENCE_RE.findall(text) if block.strip()]
+    if not blocks:
+        return text.strip("\n")
+    # Prefer the last block that defines something; explanations often come with usage snippets.
+    defining = [block for block in blocks if re.search(r"^\s*(async\s+)?def\s", block, re.M)]
+    return (defining or blocks)[-1].strip("\n")
+
+def _strip_prose(code: str) -> str:
+    lines = code.splitlines()
+    start = 0
+    while start < len(lines) and not CODE_LINE_RE.match(lines[start]):
+        start += 1
+    end = len(lines)
+    while end > start and lines[end - 1].strip() and not lines[end - 1][:1].isspace() \
+            and not CODE_LINE_RE.match(lines[end - 1]):
+        end -= 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return "\n".join(lines[start:end]) if start < end else code
+
+def _fix_tabs(code: str) -> str:
+    return re.sub(r"^[ \t]+", lambda m: m.group(0).expandtabs(4), code, flags=re.M)
+
+def _dedupe_imports(code: str) -> str:
+    seen = set()
+    lines = []
+    for line in code.splitlines():
+        if IMPORT_RE.match(line):
+            key = " ".join(line.split())
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+def _drop_truncated(code: str) -> str:
+    lines = code.rstrip().splitlines()
+    for _ in range(MAX_TRUNCATED_LINES):
+        e = syntax_error("\n".join(lines))
+        # Only cut when the error is on the last line, i.e. the output stopped mid-statement.
+        if e is None or e.lineno is None or e.lineno < len(lines) or len(lines) < 2:
+            break
+        lines.pop()
+        while lines and not lines[-1].strip():
+            lines.pop()
+    return "\n".join(lines)
+
+def _ensure_async_run(code: str) -> str:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    run = next((node for node in functions if node.name == "run"), None)
+    if isinstance(run, ast.AsyncFunctionDef):
+        return code
+    lines = code.splitlines()
+    if run is not None:
+        # execute() awaits run(), so a plain def would fail on the first call.
+        line = lines[run.lineno - 1]
+        lines[run.lineno - 1] = line.replace("def run", "async def run", 1)
+        return "\n".join(lines)
+    public = [node for node in functions if not node.name.startswith("_")]
+    if not public:
+        return code
+    target = public[-1]
+    call = f"{target.name}(*args, **kwargs)"
+    if isinstance(target, ast.AsyncFunctionDef):
+        call = f"await {call}"
+    return code.rstrip() + f"\n\nasync def run(*args, **kwargs):\n    return {call}\n"
+
+# Applied in order; the syntax fixes only run while the code still fails to compile.
+FIXES: List[Tuple[str, Callable[[str], str], bool]] = [
+    ("fences", _extract_code, False),
+    ("prose", _strip_prose, True),
+    ("tabs", _fix_tabs, True),
+    ("duplicate_imports", _dedupe_imports, False),
+    ("truncated", _drop_truncated, True),
+    ("missing_run", _ensure_async_run, False),
+]
+
+class CodeRepair:
+    """
+    Deterministic clean-up of code-generation replies, so the common ways an LLM
+    botches otherwise fine code don't cost another round-trip to fix.
+    """
+    def __init__(self):
+        self.stats: Dict[str, int] = {
+            "replies": 0,
+            "repaired": 0,
+            "retries_avoided": 0,
+            **{f"fix_{fix}": 0 for fix, _, _ in FIXES},
+        }
+
+    def repair(self, reply: str) -> str:
+        """
+        Returns the code in an LLM reply with whatever could be fixed locally fixed.
+        """
+        self.stats["replies"] += 1
+        code = reply
+        for fix, apply, only_if_broken in FIXES:
+            if only_if_broken and syntax_error(code) is None:
+                continue
+            fixed = apply(code)
+            if fixed != code:
+                self.stats[f"fix_{fix}"] += 1
+                code = fixed
+        if code.strip() != reply.strip():
+            self.stats["repaired"] += 1
+            # Unrepaired, this reply would have gone back to the LLM as a syntax error.
+            # Taking code out of fences alone doesn't count; any cleanup does that.
+            if syntax_error(code) is None and syntax_error(_extract_code(reply)) is not None:
+                self.stats["retries_avoided"] += 1
+        return code
+
+code_repair = CodeRepair()
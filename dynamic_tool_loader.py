@@ -1,34 +1,140 @@
 import os
+import ast
+import sys
+import types
 import importlib.util
 import inspect
-from typing import List
-from spoon_ai.tools.tool_manager import ToolManager
+from typing import List, Optional
+from pydantic import PrivateAttr
 from spoon_ai.tools.base import BaseTool
+from tracing import traced
+from bytecode_cache import CachedSourceLoader
 
-def load_tool(tool_manager: ToolManager, tool_path : str, fname: str) -> None:
-    print(f"Loading {tool_path}")
+PACKAGE_NAME = "generated_tools"
 
-    mod_name = f"generated_tools.{os.path.splitext(fname)[0]}"
-    
-    spec = importlib.util.spec_from_file_location(mod_name, tool_path)
+def module_name(fname: str) -> str:
+    return f"{PACKAGE_NAME}.{os.path.splitext(os.path.basename(fname))[0]}"
+
+def ensure_package(tools_dir: str) -> None:
+    # generated-tools is not importable by name, so give its modules a parent package
+    # that lets them live in sys.modules (and be pickled) as generated_tools.<name>.
+    pkg = sys.modules.get(PACKAGE_NAME)
+    if pkg is None:
+        pkg = types.ModuleType(PACKAGE_NAME)
+        pkg.__path__ = []
+        sys.modules[PACKAGE_NAME] = pkg
+    tools_dir = os.path.abspath(tools_dir)
+    if tools_dir not in pkg.__path__:
+        pkg.__path__.append(tools_dir)
+
+@traced("module.load")
+def load_module(tool_path: str, fname: str, cache: bool = True):
+    """
+    Executes a generated tool file and caches it in sys.modules. The code comes from the
+    bytecode cache when this version of the file was compiled before; cache=False keeps
+    throwaway files out of it. Raises on failure.
+    """
+    mod_name = module_name(fname)
+    ensure_package(os.path.dirname(tool_path))
+
+    spec = importlib.util.spec_from_file_location(mod_name, tool_path, loader=CachedSourceLoader(mod_name, tool_path, cache))
     if not spec or not spec.loader:
-        print("failed to load spec")
-        return
+        raise ImportError(f"failed to load spec for {tool_path}")
 
     module = importlib.util.module_from_spec(spec)
-    try:
-        spec.loader.exec_module(module)
-    except Exception as e:
-        print(e)
-        return
+    spec.loader.exec_module(module)
+    sys.modules[mod_name] = module
+    return module
+
+def instantiate_tools(module) -> List[BaseTool]:
+    tools = []
     for _, obj in inspect.getmembers(module, inspect.isclass):
-        if issubclass(obj, BaseTool) and obj is not BaseTool:
+        # Skip tool classes the generated code merely imported.
+        if issubclass(obj, BaseTool) and obj is not BaseTool and obj.__module__ == module.__name__:
             try:
                 tool = obj()
-                name = getattr(tool, "name", None)
-                
-                print(f"{name} loaded!")
-                tool_manager.add_tool(tool)
+                print(f"{getattr(tool, 'name', None)} loaded!")
+                tools.append(tool)
             except Exception as e:
                 print(e)
                 continue
+    return tools
+
+SPEC_FIELDS = ("name", "description", "parameters")
+# Read along with the spec when present; see tool_executor and result_cache for what they mean.
+OPTIONAL_SPEC_FIELDS = ("execution", "cacheable")
+
+def _is_tool_class(node: ast.ClassDef) -> bool:
+    for base in node.bases:
+        if isinstance(base, ast.Name) and base.id == "BaseTool":
+            return True
+        if isinstance(base, ast.Attribute) and base.attr == "BaseTool":
+            return True
+    return False
+
+def read_tool_specs(tool_path: str) -> Optional[List[dict]]:
+    """
+    Reads the name, description and parameters of every tool class in a file from its AST,
+    without executing it. Returns None if any tool class does not declare them as literals.
+    Raises SyntaxError if the file does not parse.
+    """
+    with open(tool_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=tool_path)
+
+    specs = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or not _is_tool_class(node):
+            continue
+        spec = {"class_name": node.name}
+        for stmt in node.body:
+            if isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name) and stmt.value is not None:
+                target, value = stmt.target.id, stmt.value
+            elif isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+                target, value = stmt.targets[0].id, stmt.value
+            else:
+                continue
+            if target in SPEC_FIELDS or target in OPTIONAL_SPEC_FIELDS:
+                try:
+                    spec[target] = ast.literal_eval(value)
+                except ValueError:
+                    return None
+        if any(field not in spec for field in SPEC_FIELDS):
+            return None
+        specs.append(spec)
+    return specs
+
+class LazyTool(BaseTool):
+    """
+    Advertises a generated tool from its statically read schema. The module is imported
+    and the real tool instantiated on the first execute.
+    """
+    tool_path: str
+    class_name: str
+    execution: str = ""
+    cacheable: bool = False
+    _tool: Optional[BaseTool] = PrivateAttr(default=None)
+
+    def resolve(self) -> BaseTool:
+        if self._tool is None:
+            # Tools defined in the same file share one import.
+            module = sys.modules.get(module_name(self.tool_path))
+            if module is None:
+                print(f"Importing {self.tool_path}")
+                module = load_module(self.tool_path, self.tool_path)
+            self._tool = getattr(module, self.class_name)()
+        return self._tool
+
+    async def execute(self, *args, **kwargs):
+        return await self.resolve().execute(*args, **kwargs)
+
+def lazy_tools(tool_path: str, specs: List[dict]) -> List[BaseTool]:
+    """
+    Builds LazyTool proxies for a file from the specs read_tool_specs returned for it.
+    """
+    # Drop any stale import so the proxies pick up the file as it is now.
+    sys.modules.pop(module_name(tool_path), None)
+    tools = []
+    for spec in specs:
+        tools.append(LazyTool(tool_path=tool_path, **spec))
+        print(f"{spec['name']} registered!")
+    return tools
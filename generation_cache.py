@@ -0,0 +1,169 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+CACHE_DIR = os.path.join(os.getcwd(), "generated-tools", ".generation-cache")
+# Minimum word overlap (Jaccard) between descriptions to reuse a tool with the same
+# inputs and outputs; 0 disables similarity matching and only exact specs hit.
+SIMILARITY_THRESHOLD = float(os.environ.get("OUROBOROS_GEN_SIMILARITY", "0"))
+
+def _words(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+def _fields(text: str) -> str:
+    # Order is kept: generated execute() passes inputs positionally to run().
+    fields = []
+    for field in text.split(","):
+        if ":" in field:
+            var_name, typ = field.split(":", 1)
+            fields.append(f"{var_name.strip()}:{_words(typ)}")
+        elif field.strip():
+            fields.append(field.strip())
+    return ",".join(fields)
+
+def normalize_spec(description: str, inputs: str, outputs: str) -> dict:
+    """
+    The parts of a generation request that determine the generated code. The tool's name
+    and class_name are deliberately left out so equal tools under new names still hit.
+    """
+    return {"description": _words(description), "inputs": _fields(inputs), "outputs": _fields(outputs)}
+
+def spec_key(spec: dict) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _similarity(a: str, b: str) -> float:
+    a_words, b_words = set(a.split()), set(b.split())
+    if not a_words or not b_words:
+        return 0.0
+    return len(a_words & b_words) / len(a_words | b_words)
+
+class GenerationCache:
+    """
+    Content-addressed store of generated tool code keyed by the normalized spec hash.
+    Entries live as one JSON file per key so every worker shares them; concurrent
+    requests for the same spec within a process share a single generation.
+    """
+    def __init__(self, cache_dir: str = CACHE_DIR, similarity: float = SIMILARITY_THRESHOLD):
+        self.cache_dir = cache_dir
+        self.similarity = similarity
+        self._entries: Dict[str, dict] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._scanned = False
+        self.stats: Dict[str, int] = {
+            "lookups": 0,
+            "hits": 0,
+            "similar_hits": 0,
+            "coalesced": 0,
+            "generations": 0,
+            "llm_calls": 0,
+            "llm_calls_saved": 0,
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            # Another worker may have generated it since we last looked.
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = self._entries[key] = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return entry
+
+    def _scan(self) -> None:
+        if self._scanned or not os.path.isdir(self.cache_dir):
+            return
+        for file in os.listdir(self.cache_dir):
+            if file.endswith(".json"):
+                self._read(file[:-len(".json")])
+        self._scanned = True
+
+    def _find_similar(self, spec: dict) -> Optional[dict]:
+        self._scan()
+        best, best_score = None, self.similarity
+        for entry in self._entries.values():
+            other = entry["spec"]
+            if other["inputs"] != spec["inputs"] or other["outputs"] != spec["outputs"]:
+                continue
+            score = _similarity(other["description"], spec["description"])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, spec: dict, raw: str, llm_calls: int = 0) -> None:
+        key = spec_key(spec)
+        entry = {"spec": spec, "raw": raw, "llm_calls": llm_calls, "created": time.time()}
+        self._entries[key] = entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Failed to write generation cache entry: {e}")
+
+    def _hit(self, stat: str, entry: dict) -> str:
+        self.stats[stat] += 1
+        self.stats["llm_calls_saved"] += entry.get("llm_calls", 0)
+        return entry["raw"]
+
+    async def generate(self, spec: dict, produce: Callable[[], Awaitable[Tuple[str, int]]],
+                       validate: Callable[[str], bool]) -> Tuple[str, str]:
+        """
+        Returns (raw code, source) for a normalized spec, where source is "hit", "similar",
+        "coalesced" or "generated". produce() runs the LLM and returns (raw, llm calls made);
+        only results that pass validate() are cached.
+        """
+        self.stats["lookups"] += 1
+        key = spec_key(spec)
+        entry = self._read(key)
+        if entry is not None:
+            return self._hit("hits", entry), "hit"
+        if self.similarity > 0:
+            entry = self._find_similar(spec)
+            if entry is not None:
+                return self._hit("similar_hits", entry), "similar"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                raw, llm_calls = await asyncio.shield(inflight)
+            except Exception:
+                pass  # the generation we joined failed; try our own below
+            else:
+                self.stats["coalesced"] += 1
+                self.stats["llm_calls_saved"] += llm_calls
+                return raw, "coalesced"
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            raw, llm_calls = await produce()
+            self.stats["generations"] += 1
+            self.stats["llm_calls"] += llm_calls
+            if validate(raw):
+                self.put(spec, raw, llm_calls)
+            future.set_result((raw, llm_calls))
+            return raw, "generated"
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else RuntimeError("generation was cancelled"))
+            # Waiters see the exception; don't warn about it going unretrieved if there are none.
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def snapshot(self) -> Dict[str, float]:
+        served = self.stats["hits"] + self.stats["similar_hits"] + self.stats["coalesced"]
+        lookups = self.stats["lookups"]
+        return {**self.stats, "hit_rate": served / lookups if lookups else 0.0}
+
+generation_cache = GenerationCache()
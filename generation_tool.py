@@ -1,33 +1,29 @@
 import re
+import ast
+import asyncio
 from typing import List, Tuple
 from spoon_ai.tools.base import BaseTool
 from spoon_ai.chat import ChatBot
 import os
-import subprocess
 import sys
 
-from spoon_ai.tools.tool_manager import ToolManager
-
-from dynamic_tool_loader import load_tool
+from tool_registry import ToolView, tool_file_lock
+from package_installer import installer
+from generation_cache import generation_cache, normalize_spec
+from result_cache import result_cache
+from bytecode_cache import bytecode_cache
+from turn_events import emit
+from tracing import span, traced
 from tool_generation_agent import ToolGenerationAgent
 from tool_review_agent import RetoolAgent
 
-def _strip_code_fences(code: str) -> str:
-    s = code.strip()
-    if s.startswith("```"):
-        s = s.removeprefix("```")
-    if s.lower().startswith("python"):
-        s = s[len("python"):]
-    if s.endswith("```"):
-        s = s[: -len("```")]
-    return s.strip()
-
 def _extract_imports_and_body(code: str) -> Tuple[List[str], str]:
     lines = code.splitlines()
     imports: List[str] = []
     body_lines: List[str] = []
     seen = set()
-    imp_re = re.compile(r"^\s*(import\s+.+|from\s+\S+\s+import\s+.+)")
+    # Top-level imports only: one inside a function or try block has to stay where it is.
+    imp_re = re.compile(r"^(import\s+.+|from\s+\S+\s+import\s+.+)")
     for line in lines:
         m = imp_re.match(line)
         if m:
@@ -40,40 +36,63 @@ def _extract_imports_and_body(code: str) -> Tuple[List[str], str]:
     body = "\n".join(body_lines).strip()
     return imports, body
 
-def _extract_latest_step_code(text: str) -> str:
-    step_iter = list(re.finditer(r"(?is)\bStep\s*\d+\s*:", text))
-    if step_iter:
-        last = step_iter[-1]
-        tail = text[last.end():]
-    else:
-        tail = text
-    blocks = re.findall(r"```(?:python\s*)?([\s\S]*?)```", tail)
-    if blocks:
-        return blocks[-1].strip()
-    return tail.strip()
-
-def install_package(package):
+def parse_packages(final_code) -> List[str]:
     """
-    Installs a Python package dynamically using pip via subprocess.
+    Returns the pip packages listed on the "# install modules:" line, minus stdlib modules.
     """
-    try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-        print(f"Successfully installed {package}")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to install {package}: {e}")
-
-def parse_packages(final_code):
+    packages = []
     for line in final_code.splitlines():
         line = line.strip()
         if line.startswith("# install modules:"):
             line = line.removeprefix("# install modules:").strip()
-            for module in line.split(" "):
-                install_package(module)
+            for module in line.replace(",", " ").split():
+                if module.lower() not in ("none", "n/a") and module not in sys.stdlib_module_names:
+                    packages.append(module)
+    return packages
 
-def gen_code(raw, inputs, class_name, name):
-    latest = _extract_latest_step_code(raw)
-    cleaned = _strip_code_fences(latest)
-    imports, body = _extract_imports_and_body(cleaned)
+def _imported_modules(imports: List[str]) -> List[str]:
+    """
+    Top-level module of every name the import lines pull in ("import a.b, c" gives a and c).
+    Relative imports give "", which matches no known module.
+    """
+    modules = []
+    for imp in imports:
+        try:
+            nodes = ast.parse(imp).body
+        except SyntaxError:
+            # e.g. the first line of a parenthesized multi-line import
+            modules.append(imp.split()[1].rstrip(",(").split(".")[0])
+            continue
+        for node in nodes:
+            if isinstance(node, ast.Import):
+                modules += [alias.name.split(".")[0] for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                modules.append("" if node.level else node.module.split(".")[0])
+    return modules
+
+IO_MODULES = ("requests", "httpx", "aiohttp", "urllib", "http", "socket")
+
+def _is_io_bound(imports: List[str]) -> bool:
+    # Network-bound tools are cheap to run on a thread; everything else gets a worker process.
+    return any(module in IO_MODULES for module in _imported_modules(imports))
+
+# Modules whose use makes a tool's result depend on more than its arguments.
+IMPURE_MODULES = IO_MODULES + ("random", "secrets", "uuid", "time", "datetime", "os", "subprocess",
+                               "shutil", "pathlib", "tempfile", "sqlite3", "asyncio")
+IMPURE_WORDS = re.compile(r"\b(random|shuffl|current|now|today|latest|live|real[- ]?time|search|fetch|"
+                          r"download|weather|price|stock|news)", re.IGNORECASE)
+
+def _is_cacheable(imports: List[str], description: str) -> bool:
+    # Only pure stdlib computations (counting, parsing, ...) are safe to memoize.
+    for module in _imported_modules(imports):
+        if module not in sys.stdlib_module_names or module in IMPURE_MODULES:
+            return False
+    return not IMPURE_WORDS.search(description)
+
+@traced("gen_code")
+def gen_code(raw, inputs, class_name, name, description):
+    # raw is the accepted draft, already taken out of fences and cleaned by code_repair.
+    imports, body = _extract_imports_and_body(raw.strip())
     header = ["from spoon_ai.tools.base import BaseTool"] + imports
     assembled_parts = []
     assembled_parts.append("\n".join(header).strip())
@@ -104,6 +123,8 @@ def gen_code(raw, inputs, class_name, name):
     tool_class = (
         f"class {class_name}(BaseTool):\n"
         f"    name: str = \"{name}\"\n"
+        + (f"    execution: str = \"thread\"\n" if _is_io_bound(imports) else "")
+        + (f"    cacheable: bool = True\n" if _is_cacheable(imports, description) else "") +
         f"    description: str = {repr(description)}\n"
         f"    parameters: dict = {{\n"
         f"        \"type\": \"object\",\n"
@@ -123,6 +144,30 @@ def gen_code(raw, inputs, class_name, name):
 def tool_path(class_name: str, out_dir):
     return os.path.join(out_dir, f"{class_name}.py")
 
+def _compiles(code: str) -> bool:
+    try:
+        with span("compile"):
+            compile(code, "<string>", "exec")
+        return True
+    except SyntaxError:
+        return False
+
+def _write_tool(out_path: str, final_code: str) -> None:
+    # Workers writing the same class take turns, and the rename means readers only ever
+    # see a complete file, old or new.
+    with tool_file_lock(out_path):
+        # Rewriting identical code would only make every worker reload it.
+        if os.path.exists(out_path):
+            with open(out_path, "r", encoding="utf-8") as f:
+                if f.read() == final_code:
+                    return
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(final_code)
+        os.replace(tmp_path, out_path)
+        # Compile once here so no worker has to, and retire the previous version's bytecode.
+        bytecode_cache.store(out_path)
+
 name: str = "generation_tool"
 description: str = "Generates a tool class file from a description. This should be used for any complex tasks that an LLM may not have reliable accuracy on, or things that require external APIs or arbitrary code execution."
 parameters: dict = {
@@ -139,25 +184,36 @@ parameters: dict = {
 
 class GenerationTool(BaseTool):
     agent: ToolGenerationAgent = None
-    tool_mgr: ToolManager = None
+    tool_mgr: ToolView = None
 
-    def __init__(self, llm: ChatBot, tool_manager: ToolManager):
+    def __init__(self, llm: ChatBot, tool_manager: ToolView):
         super().__init__(name=name, description=description, parameters=parameters)
         self.agent = ToolGenerationAgent(llm)
         self.tool_mgr = tool_manager
 
-    async def _generate_code(self, spec: str) -> str:
-        return await self.agent.run(spec)
+    async def _generate_code(self, spec: str) -> Tuple[str, int]:
+        calls_before = self.agent.llm_calls
+        await self.agent.run(spec)
+        return self.agent.code, self.agent.llm_calls - calls_before
 
     async def execute(self, name: str, description: str, inputs: str, outputs: str, class_name: str = "GeneratedTaskTool") -> str:
         print(f"Attempting to generate {class_name}.")
-
-        raw = await self._generate_code(f"name: \"{name}\", description: \"{description}\", inputs: \"{inputs}\", outputs: \"{outputs}\"")
-
-        final_code = gen_code(raw, inputs, class_name, name)
+        self.agent.assemble = lambda raw: gen_code(raw, inputs, class_name, name, description)
+
+        # Equal specs are generated once across sessions, whatever they name the tool.
+        raw, source = await generation_cache.generate(
+            normalize_spec(description, inputs, outputs),
+            lambda: self._generate_code(f"name: \"{name}\", description: \"{description}\", inputs: \"{inputs}\", outputs: \"{outputs}\""),
+            lambda raw: _compiles(gen_code(raw, inputs, class_name, name, description)),
+        )
+        if source != "generated":
+            print(f"Reusing cached code for {class_name} ({source}).")
+
+        final_code = gen_code(raw, inputs, class_name, name, description)
         
         try:
-            compile(final_code, "<string>", "exec")
+            with span("compile"):
+                compile(final_code, "<string>", "exec")
         except SyntaxError as e:
             print(f"SyntaxError: {e.msg}")
             print(f"Line: {e.lineno}")
@@ -165,15 +221,15 @@ class GenerationTool(BaseTool):
             return "Failed to generate code. Try again, or if this fails consistently, this may not be possible."
 
 
-        parse_packages(final_code)
+        await installer.install(parse_packages(final_code))
 
-        out_dir = os.path.join(os.getcwd(), "generated-tools")
+        out_dir = self.tool_mgr.registry.tools_dir
         os.makedirs(out_dir, exist_ok=True)
         out_path = tool_path(class_name, out_dir)
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(final_code)
+        await asyncio.to_thread(_write_tool, out_path, final_code)
 
-        load_tool(self.tool_mgr, out_path, class_name)
+        self.tool_mgr.publish(out_path)
+        emit("tool_generated", tool=name, class_name=class_name, source=source)
 
         return f"Successfully generated tool with name {name}"
 
@@ -196,34 +252,39 @@ params2: dict = {
 
 class ReTool(BaseTool):
     agent: RetoolAgent = None
-    tool_mgr: ToolManager = None
+    tool_mgr: ToolView = None
 
-    def __init__(self, llm: ChatBot, tool_manager: ToolManager):
+    def __init__(self, llm: ChatBot, tool_manager: ToolView):
         super().__init__(name=name2, description=desc2, parameters=params2)
         self.agent = RetoolAgent(llm)
         self.tool_mgr = tool_manager
 
-    async def _generate_code(self, spec: str) -> str:
-        return await self.agent.run(spec)
+    async def _generate_code(self, spec: str) -> Tuple[str, int]:
+        calls_before = self.agent.llm_calls
+        await self.agent.run(spec)
+        return self.agent.code, self.agent.llm_calls - calls_before
 
     async def execute(self, name: str, description: str, inputs: str, outputs: str, class_name: str, inference_args: str) -> str:
         print(f"Attempting to rebuild {class_name}.")
         
-        out_dir = os.path.join(os.getcwd(), "generated-tools")
+        out_dir = self.tool_mgr.registry.tools_dir
         path = tool_path(class_name, out_dir)
         prev_code = ""
         with open(path, 'r') as file:
             prev_code = file.read()
 
-        raw = await self._generate_code(f"name: \"{name}\", description: \"{description}\", inputs: \"{inputs}\", outputs: \"{outputs}\"\n"\
+        self.agent.assemble = lambda raw: gen_code(raw, inputs, class_name, name, description)
+
+        raw, llm_calls = await self._generate_code(f"name: \"{name}\", description: \"{description}\", inputs: \"{inputs}\", outputs: \"{outputs}\"\n"\
             f"Previous Iteration:\n"\
             f"{prev_code}\n"\
             f"Feedback:\n" \
             f"{inference_args}")
-        final_code = gen_code(raw, inputs, class_name, name)
+        final_code = gen_code(raw, inputs, class_name, name, description)
         
         try:
-            compile(final_code, "<string>", "exec")
+            with span("compile"):
+                compile(final_code, "<string>", "exec")
         except SyntaxError as e:
             print(f"SyntaxError: {e.msg}")
             print(f"Line: {e.lineno}")
@@ -231,12 +292,15 @@ class ReTool(BaseTool):
             return "Failed to generate code. Try again, or if this fails consistently, this may not be possible."
 
 
-        parse_packages(final_code)
+        await installer.install(parse_packages(final_code))
 
         out_path = tool_path(class_name, out_dir)
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(final_code)
+        await asyncio.to_thread(_write_tool, out_path, final_code)
+        result_cache.invalidate(name)
+        # Later requests for this spec should get the fixed version.
+        generation_cache.put(normalize_spec(description, inputs, outputs), raw, llm_calls)
 
-        load_tool(self.tool_mgr, out_path, class_name)
+        self.tool_mgr.publish(out_path)
+        emit("tool_rebuilt", tool=name, class_name=class_name)
 
         return f"Successfully rebuilt tool with name {name}"
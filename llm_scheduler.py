@@ -0,0 +1,204 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+# In-flight LLM calls allowed per provider/model, with per-lane overrides such as
+# "gemini/gemini-2.5-pro=2,gemini=6" (model-specific entries win over provider-wide ones).
+LLM_CONCURRENCY = int(os.environ.get("OUROBOROS_LLM_CONCURRENCY", "8"))
+LLM_LIMITS = os.environ.get("OUROBOROS_LLM_LIMITS", "")
+# Token bucket per lane: sustained calls per second (0 = unlimited) and burst size.
+LLM_RATE = float(os.environ.get("OUROBOROS_LLM_RPS", "0"))
+LLM_BURST = int(os.environ.get("OUROBOROS_LLM_BURST", str(LLM_CONCURRENCY)))
+# New turns are turned away once this many calls are waiting, or the wait would exceed LLM_MAX_WAIT.
+LLM_MAX_QUEUE = int(os.environ.get("OUROBOROS_LLM_QUEUE", "64"))
+LLM_MAX_WAIT = float(os.environ.get("OUROBOROS_LLM_MAX_WAIT", "30"))
+
+# Lower runs first: the user-facing agent ahead of tool generation it kicked off.
+USER_PRIORITY = 0
+BACKGROUND_PRIORITY = 10
+
+class LLMOverloaded(Exception):
+    """
+    Raised instead of queueing a new turn the LLM lane cannot serve in time.
+    status is the HTTP status to answer with (429 rate limited, 503 queue full).
+    """
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            lane, limit = item.split("=", 1)
+            limits[lane.strip()] = int(limit)
+    return limits
+
+class _Lane:
+    def __init__(self, limit: int, rate: float, burst: int):
+        self.limit = max(1, limit)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.active = 0
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # Moving average of call duration, for Retry-After estimates.
+        self.avg_seconds = 1.0
+        self.stats: Dict[str, float] = {
+            "calls": 0,
+            "queued": 0,
+            "wait_seconds": 0.0,
+            "rejected_queue_full": 0,
+            "rejected_rate_limited": 0,
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _token_wait(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def _grant(self) -> None:
+        self.active += 1
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def pending(self) -> int:
+        return sum(1 for _, _, future in self.waiters if not future.done())
+
+    def estimated_wait(self) -> float:
+        ahead = self.pending()
+        wait = 0.0
+        if self.active >= self.limit:
+            wait = (ahead + 1) / self.limit * self.avg_seconds
+        if self.rate > 0:
+            self._refill()
+            wait = max(wait, (ahead + 1 - self.tokens) / self.rate)
+        return wait
+
+    def dispatch(self) -> None:
+        # Hand free slots to the best waiters, in priority then arrival order.
+        while self.waiters and self.active < self.limit:
+            _, _, future = self.waiters[0]
+            if future.done():  # cancelled while waiting
+                heapq.heappop(self.waiters)
+                continue
+            wait = self._token_wait()
+            if wait > 0:
+                if self.timer is None:
+                    self.timer = asyncio.get_running_loop().call_later(wait, self._wake)
+                return
+            heapq.heappop(self.waiters)
+            self._grant()
+            future.set_result(None)
+
+    def _wake(self) -> None:
+        self.timer = None
+        self.dispatch()
+
+    def release(self, seconds: float) -> None:
+        self.active -= 1
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+        self.dispatch()
+
+class LLMScheduler:
+    """
+    Gatekeeper for every LLM call: caps in-flight calls and call rate per provider/model,
+    serves waiting calls by priority, and turns away new turns that would only queue up
+    until they time out.
+    """
+    def __init__(self, concurrency: int = LLM_CONCURRENCY, limits: str = LLM_LIMITS, rate: float = LLM_RATE,
+                 burst: int = LLM_BURST, max_queue: int = LLM_MAX_QUEUE, max_wait: float = LLM_MAX_WAIT):
+        self.concurrency = concurrency
+        self.limits = _parse_limits(limits)
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lanes: Dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    def lane_name(self, llm) -> str:
+        provider = getattr(llm, "llm_provider", None) or "default"
+        model = getattr(llm, "model_name", None) or "default"
+        return f"{provider}/{model}"
+
+    def _lane(self, llm) -> _Lane:
+        name = self.lane_name(llm)
+        lane = self._lanes.get(name)
+        if lane is None:
+            limit = self.limits.get(name, self.limits.get(name.split("/", 1)[0], self.concurrency))
+            lane = self._lanes[name] = _Lane(limit, self.rate, self.burst)
+        return lane
+
+    def admit(self, llm) -> None:
+        """
+        Checks that a new turn on this LLM can start; raises LLMOverloaded if not.
+        Calls made by turns already running are never turned away, only queued.
+        """
+        lane = self._lane(llm)
+        wait = lane.estimated_wait()
+        retry_after = max(1, math.ceil(wait))
+        if lane.pending() >= self.max_queue:
+            lane.stats["rejected_queue_full"] += 1
+            raise LLMOverloaded(f"Too many requests waiting for {self.lane_name(llm)}", 503, retry_after)
+        if wait > self.max_wait:
+            lane.stats["rejected_rate_limited"] += 1
+            raise LLMOverloaded(f"{self.lane_name(llm)} is rate limited", 429, retry_after)
+
+    @asynccontextmanager
+    async def slot(self, llm, priority: int = USER_PRIORITY):
+        """
+        Holds one of the lane's in-flight slots for the duration of an LLM call.
+        """
+        lane = self._lane(llm)
+        lane.stats["calls"] += 1
+        start = time.monotonic()
+        if not lane.pending() and lane.active < lane.limit and lane._token_wait() == 0:
+            lane._grant()
+        else:
+            lane.stats["queued"] += 1
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(lane.waiters, (priority, next(self._seq), future))
+            lane.dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    lane.release(0.0)  # granted just as we were cancelled
+                raise
+            lane.stats["wait_seconds"] += time.monotonic() - start
+        granted = time.monotonic()
+        try:
+            yield
+        finally:
+            lane.release(time.monotonic() - granted)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            name: {**lane.stats, "limit": lane.limit, "active": lane.active, "waiting": lane.pending()}
+            for name, lane in self._lanes.items()
+        }
+
+    def totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for lane in self.snapshot().values():
+            for key, value in lane.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+llm_scheduler = LLMScheduler()
@@ -1,12 +1,39 @@
+import os
+import time
 import uvicorn
 import asyncio
-from typing import Dict, List, Optional
+from types import SimpleNamespace
+from typing import List, Optional
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from spoon_ai.chat import ChatBot
 from adaptive_agent import AdaptiveAgent
-import time
+from session_store import SessionStore
+from tool_registry import registry, ToolWatcher
+from package_installer import installer
+from tool_executor import executor
+from generation_cache import generation_cache
+from code_repair import code_repair
+from result_cache import result_cache
+from turn_events import stream, sse, ndjson
+from tracing import metrics, traced, trace, request_id
+from llm_scheduler import llm_scheduler, LLMOverloaded
+from memory_compaction import memory_compactor
+from bytecode_cache import bytecode_cache
+from agent_pool import AgentPool
+from batch_runner import StatelessRunner, BATCH_CONCURRENCY, BATCH_MAX_ITEMS
+
+# Worker processes when run as a script. With more than one, sessions are kept in the
+# shared SQLite store (see session_store) and tools written by one worker reach the
+# others through the tool watcher.
+WORKERS = int(os.environ.get("OUROBOROS_WORKERS", "1"))
+LLM_PROVIDER = "gemini"
+LLM_MODEL = "gemini-2.5-flash"
+# Stands in for an agent's ChatBot when admitting a turn, which only needs the LLM lane.
+# Lets overloaded requests be turned away before a session or agent is created.
+CHAT_LLM = SimpleNamespace(llm_provider=LLM_PROVIDER, model_name=LLM_MODEL)
 
 app = FastAPI()
 
@@ -32,67 +59,294 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     tools: List[str]
+    new_tools: List[str] = []
     is_reflex: bool
     time_taken: float
+    step_timings: List[float] = []
+
+class BatchItem(BaseModel):
+    message: str
+    # Without a session the prompt is stateless: it may share a run with identical
+    # prompts in flight and be answered from the response cache.
+    session_id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    concurrency: int = BATCH_CONCURRENCY
+    stream: bool = False
+    use_cache: bool = True
+
+class BatchResult(BaseModel):
+    index: int
+    response: Optional[str] = None
+    error: Optional[str] = None
+    status: int = 200
+    new_tools: List[str] = []
+    is_reflex: bool = True
+    # "run", "coalesced" (shared an identical prompt's run) or "cached"
+    source: str = "run"
+    time_taken: float
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+    time_taken: float
 
 # 3. SESSION MANAGEMENT
-agent_sessions: Dict[str, AdaptiveAgent] = {}
+def build_agent() -> AdaptiveAgent:
+    chatbot = ChatBot(model_name=LLM_MODEL, llm_provider=LLM_PROVIDER, temperature=0.1)
+    return AdaptiveAgent(chatbot)
 
-def get_or_create_agent(session_id: str):
-    if session_id not in agent_sessions:
-        print(f"Initializing new Adaptive Agent for session: {session_id}")
-        chatbot = ChatBot(model_name="gemini-2.5-flash", llm_provider="gemini", temperature=0.1)
-        agent_sessions[session_id] = AdaptiveAgent(chatbot)
-    return agent_sessions[session_id]
+agent_pool = AgentPool(build_agent)
+
+@traced("session.create")
+async def create_agent(session_id: str) -> AdaptiveAgent:
+    print(f"Initializing new Adaptive Agent for session: {session_id}")
+    return await agent_pool.take()
+
+agent_sessions = SessionStore()
+stateless_runner = StatelessRunner(agent_pool.take, CHAT_LLM)
+tool_watcher = ToolWatcher(registry)
+
+async def get_or_create_agent(session_id: str) -> AdaptiveAgent:
+    agent = await agent_sessions.get(session_id)
+    if agent is None:
+        # New, evicted or idle-expired session: a pool miss is built off the event loop.
+        agent = await agent_sessions.add(session_id, await create_agent(session_id))
+    return agent
+
+def error_response(msg: str):
+    # (status, detail) reported for a failed turn
+    if "api key" in msg.lower():
+        return 400, "LLM provider API key missing or invalid"
+    return 500, msg
 
 # 4. ENDPOINTS
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request, http_response: Response):
+    rid = request_id(http_request.headers.get("x-request-id"))
+    http_response.headers["X-Request-ID"] = rid
     try:
-        agent = get_or_create_agent(request.session_id)
-        
-        # Added timeout to prevent hanging  
-        result_text = await asyncio.wait_for(agent.run(request.message), timeout=60)
-        tools_before = len(agent.available_tools.tool_map) if hasattr(agent.available_tools, "tool_map") else 0
-        start_time = time.time()
-        result_text = await asyncio.wait_for(agent.run(request.message), timeout=60) # idk if this is right 
-        duration = time.time() - start_time
-
-        tools_after = len(agent.available_tools.tool_map) if hasattr(agent.available_tools, "tool_map") else 0
-        is_reflex = tools_after == tools_before
-        
-        current_tools = []
-        if hasattr(agent.available_tools, "tool_map"):
-            current_tools = list(agent.available_tools.tool_map.keys())
-        
+        with trace(rid, session_id=request.session_id):
+            # Fail fast rather than queue behind an LLM that can't take more work.
+            llm_scheduler.admit(CHAT_LLM)
+            agent = await get_or_create_agent(request.session_id)
+
+            # Added timeout to prevent hanging
+            turn = await agent.run_turn(request.message, timeout=60)
+            await agent_sessions.commit(request.session_id)
+
         return ChatResponse(
-            response=str(result_text),
-            tools=current_tools,
-            is_reflex = is_reflex,
-            time_taken = duration
+            response=turn.response,
+            tools=list(agent.available_tools.tool_map.keys()),
+            new_tools=turn.new_tools,
+            is_reflex=not turn.new_tools,
+            time_taken=turn.duration,
+            step_timings=turn.step_timings,
         )
 
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=e.status, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
-        msg = str(e)
-        if "api key" in msg.lower():
-            raise HTTPException(status_code=400, detail="LLM provider API key missing or invalid")
-        raise HTTPException(status_code=500, detail=msg)
+        status, detail = error_response(str(e))
+        raise HTTPException(status_code=status, detail=detail)
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Streams one event per agent step (thinking, tool start/end, tool generated or rebuilt,
+    package installed, the answer) followed by a final "done" event carrying the
+    ChatResponse. Server-Sent Events by default; NDJSON if the client accepts
+    application/x-ndjson. Each step is bounded by OUROBOROS_STEP_TIMEOUT, not the turn.
+    A failed turn ends the stream with an "error" event carrying the status /chat would return.
+    """
+    rid = request_id(http_request.headers.get("x-request-id"))
+    try:
+        llm_scheduler.admit(CHAT_LLM)
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=e.status, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    use_ndjson = "application/x-ndjson" in http_request.headers.get("accept", "")
+    encode = ndjson if use_ndjson else sse
+
+    async def events():
+        with trace(rid, session_id=request.session_id, stream=True):
+            # Fetched here, when the body starts, so the session cannot be evicted in between.
+            try:
+                agent = await get_or_create_agent(request.session_id)
+            except Exception as e:
+                status, detail = error_response(str(e))
+                yield encode({"event": "error", "error": detail, "status": status})
+                return
+            async for event in stream(agent.run_turn(request.message)):
+                if event["event"] == "error":
+                    event["status"], event["error"] = error_response(event["error"])
+                elif event["event"] == "done":
+                    await agent_sessions.commit(request.session_id)
+                    turn = event.pop("result")
+                    event["response"] = ChatResponse(
+                        response=turn.response,
+                        tools=list(agent.available_tools.tool_map.keys()),
+                        new_tools=turn.new_tools,
+                        is_reflex=not turn.new_tools,
+                        time_taken=turn.duration,
+                        step_timings=turn.step_timings,
+                    ).model_dump()
+                yield encode(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson" if use_ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Request-ID": rid},
+    )
+
+@app.post("/chat/batch", response_model=BatchResponse)
+async def chat_batch_endpoint(request: BatchRequest, http_request: Request, http_response: Response):
+    """
+    Runs many messages concurrently, at most `concurrency` (capped by
+    OUROBOROS_BATCH_CONCURRENCY) at a time. Each item reports its own status and
+    time_taken, so one failure does not fail the batch. Results come back in input
+    order, or with "stream": true as NDJSON lines in completion order.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    rid = request_id(http_request.headers.get("x-request-id"))
+    limit = asyncio.Semaphore(max(1, min(request.concurrency, BATCH_CONCURRENCY)))
+
+    async def run_item(index: int, item: BatchItem) -> BatchResult:
+        async with limit:
+            start = time.perf_counter()
+            try:
+                if item.session_id is None:
+                    turn, source = await stateless_runner.run(item.message, timeout=60, use_cache=request.use_cache)
+                else:
+                    llm_scheduler.admit(CHAT_LLM)
+                    agent = await get_or_create_agent(item.session_id)
+                    turn, source = await agent.run_turn(item.message, timeout=60), "run"
+                    await agent_sessions.commit(item.session_id)
+            except LLMOverloaded as e:
+                return BatchResult(index=index, error=str(e), status=e.status, time_taken=time.perf_counter() - start)
+            except Exception as e:
+                status, detail = error_response(str(e) or type(e).__name__)
+                return BatchResult(index=index, error=detail, status=status,
+                                   time_taken=time.perf_counter() - start)
+            # Only the run that produced a shared answer generated its tools.
+            new_tools = turn.new_tools if source == "run" else []
+            return BatchResult(
+                index=index,
+                response=turn.response,
+                new_tools=new_tools,
+                is_reflex=not new_tools,
+                source=source,
+                time_taken=time.perf_counter() - start,
+            )
+
+    if request.stream:
+        async def results():
+            with trace(rid, items=len(request.items), stream=True):
+                tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(request.items)]
+                try:
+                    for done in asyncio.as_completed(tasks):
+                        yield ndjson((await done).model_dump())
+                finally:
+                    for task in tasks:
+                        task.cancel()
+
+        return StreamingResponse(results(), media_type="application/x-ndjson", headers={"X-Request-ID": rid})
+
+    http_response.headers["X-Request-ID"] = rid
+    start = time.perf_counter()
+    with trace(rid, items=len(request.items)):
+        results = await asyncio.gather(*(run_item(i, item) for i, item in enumerate(request.items)))
+    return BatchResponse(results=results, time_taken=time.perf_counter() - start)
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+@app.get("/stats/sessions")
+async def session_stats():
+    return {**agent_sessions.snapshot(), "pool": agent_pool.snapshot()}
+
+@app.get("/stats/installs")
+async def install_stats():
+    return {**installer.stats, "history": installer.history}
+
+@app.get("/stats/tools")
+async def tool_stats():
+    return {
+        **executor.stats,
+        "mode": executor.mode,
+        "tools": len(registry.tool_map),
+        "retrieval": registry.retriever.snapshot(),
+        "bytecode": bytecode_cache.snapshot(),
+    }
+
+@app.get("/stats/generation")
+async def generation_stats():
+    return {**generation_cache.snapshot(), "repair": code_repair.stats}
+
+@app.get("/stats/results")
+async def result_stats():
+    return result_cache.snapshot()
+
+@app.get("/stats/batch")
+async def batch_stats():
+    return stateless_runner.snapshot()
+
+@app.get("/stats/llm")
+async def llm_stats():
+    return llm_scheduler.snapshot()
+
+@app.get("/stats/memory")
+async def memory_stats():
+    return memory_compactor.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Prometheus text format: span latency histograms plus the counters behind /stats/*.
+    return PlainTextResponse(metrics.render({
+        "sessions": agent_sessions.snapshot(),
+        "pool": agent_pool.snapshot(),
+        "installs": installer.stats,
+        "executor": executor.stats,
+        "generation": generation_cache.snapshot(),
+        "repair": code_repair.stats,
+        "results": result_cache.snapshot(),
+        "llm": llm_scheduler.totals(),
+        "memory": memory_compactor.snapshot(),
+        "retrieval": registry.retriever.snapshot(),
+        "bytecode": bytecode_cache.snapshot(),
+        "batch": stateless_runner.snapshot(),
+    }), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 async def startup_event():
-    # Pre-warm the default agent so the first request isn't slow
-    print("Pre-loading default agent...")
-    agent = get_or_create_agent("demo-session-default")
+    # Scan the tools once and build agents ahead of the first requests; every agent
+    # shares the registry, so building them does not load any tool again.
+    print("Pre-loading agents...")
     try:
-        if hasattr(agent, "initialize"):
-            agent.initialize()
+        await asyncio.to_thread(registry.load_all)
+        await agent_pool.fill()
+        await get_or_create_agent("demo-session-default")
     except Exception as e:
         print(f"Startup warning: {e}")
+    agent_pool.start()
+    # Pick up tools generated by other workers without a restart
+    tool_watcher.start()
+    try:
+        await executor.warm()
+    except Exception as e:
+        print(f"Startup warning: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await agent_pool.stop()
+    await tool_watcher.stop()
+    await agent_sessions.flush()
+    executor.shutdown()
 
 # start server
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
+    if WORKERS > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=8080, workers=WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
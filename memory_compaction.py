@@ -0,0 +1,157 @@
+import os
+import json
+import uuid
+from typing import Dict, List, Optional
+from spoon_ai.schema import Message
+
+# Rough per-session prompt budget in tokens (history only; 0 disables compaction).
+MEMORY_TOKEN_BUDGET = int(os.environ.get("OUROBOROS_MEMORY_TOKENS", "12000"))
+# Most recent user turns kept verbatim; older ones are folded into a summary.
+MEMORY_KEEP_TURNS = int(os.environ.get("OUROBOROS_MEMORY_TURNS", "6"))
+# Tool outputs from earlier turns longer than this are cut down to a reference.
+TOOL_OUTPUT_CHARS = int(os.environ.get("OUROBOROS_TOOL_OUTPUT_CHARS", "2000"))
+SUMMARY_CHARS = 3000
+CHARS_PER_TOKEN = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+COLLAPSED_MARKER = "characters of this output omitted"
+# The user message that opens a turn carries an id with this prefix. Every other user
+# message (next-step prompts, the SDK's stuck-state nudges) belongs to the turn before it.
+TURN_ID_PREFIX = "turn:"
+
+def turn_message_id() -> str:
+    return f"{TURN_ID_PREFIX}{uuid.uuid4().hex}"
+
+def starts_turn(message: Message) -> bool:
+    return message.role == "user" and (message.id or "").startswith(TURN_ID_PREFIX)
+
+def estimate_tokens(messages: List[Message]) -> int:
+    # No tokenizer offline; ~4 characters per token is close enough to steer by.
+    chars = 0
+    for m in messages:
+        chars += len(m.content or "") + 16
+        if m.tool_calls:
+            chars += len(json.dumps([call if isinstance(call, dict) else call.model_dump() for call in m.tool_calls], default=str))
+    return chars // CHARS_PER_TOKEN
+
+def _clip(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def _tool_names(messages: List[Message]) -> List[str]:
+    names = []
+    for m in messages:
+        if m.role == "tool" and m.name and m.name not in names:
+            names.append(m.name)
+    return names
+
+class MemoryCompactor:
+    """
+    Keeps a session's history within budget before each LLM call: drops the repeated
+    next-step prompts of finished turns, cuts large tool outputs from earlier turns down
+    to their head and tail, and folds turns beyond the rolling window (or over the token
+    budget) into a single summary message. The current turn is never touched.
+    """
+    def __init__(self, budget: int = MEMORY_TOKEN_BUDGET, keep_turns: int = MEMORY_KEEP_TURNS,
+                 tool_output_chars: int = TOOL_OUTPUT_CHARS):
+        self.budget = budget
+        self.keep_turns = max(1, keep_turns)
+        self.tool_output_chars = tool_output_chars
+        self.stats: Dict[str, int] = {
+            "compactions": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "turns_summarized": 0,
+            "tool_outputs_collapsed": 0,
+            "step_prompts_dropped": 0,
+        }
+
+    def _collapse(self, message: Message) -> Message:
+        content = message.content or ""
+        head = content[:self.tool_output_chars * 3 // 4]
+        tail = content[-(self.tool_output_chars // 4):]
+        omitted = len(content) - len(head) - len(tail)
+        self.stats["tool_outputs_collapsed"] += 1
+        return message.model_copy(update={"content": f"{head}\n[... {omitted} {COLLAPSED_MARKER} ...]\n{tail}"})
+
+    def _summarize(self, summary: str, turns: List[List[Message]]) -> str:
+        lines = [summary] if summary else []
+        for turn in turns:
+            answer = next((m.content for m in reversed(turn) if m.role == "assistant" and m.content), "")
+            tools = _tool_names(turn)
+            lines.append(
+                f"- User: {_clip(turn[0].content, 200)}"
+                + (f" | tools used: {', '.join(tools)}" if tools else "")
+                + (f" | answer: {_clip(answer, 200)}" if answer else "")
+            )
+        text = "\n".join(lines)
+        # The summary counts against the budget too; oldest lines go first once it gets long.
+        limit = min(SUMMARY_CHARS, self.budget * CHARS_PER_TOKEN // 4)
+        return text[-limit:] if len(text) > limit else text
+
+    def compact(self, messages: List[Message]) -> List[Message]:
+        if self.budget <= 0 or not messages:
+            return messages
+        before = estimate_tokens(messages)
+
+        summary = ""
+        rest = messages
+        if rest[0].role == "system" and (rest[0].content or "").startswith(SUMMARY_PREFIX):
+            summary = rest[0].content[len(SUMMARY_PREFIX):].strip()
+            rest = rest[1:]
+
+        # Turns start at the messages run_turn marked; anything before the first one (or
+        # a whole history saved before turns were marked) stays with it.
+        turns: List[List[Message]] = []
+        for m in rest:
+            if starts_turn(m) or not turns:
+                turns.append([m])
+            else:
+                turns[-1].append(m)
+        if len(turns) <= 1:
+            return messages
+
+        folded = []
+        while len(turns) > self.keep_turns:
+            folded.append(turns.pop(0))
+
+        changed = bool(folded)
+        for i, turn in enumerate(turns[:-1]):
+            kept = []
+            for m in turn:
+                if m.role == "user" and not starts_turn(m) and starts_turn(turn[0]):
+                    self.stats["step_prompts_dropped"] += 1
+                    changed = True
+                    continue
+                content = m.content or ""
+                if m.role == "tool" and len(content) > self.tool_output_chars and COLLAPSED_MARKER not in content:
+                    m = self._collapse(m)
+                    changed = True
+                kept.append(m)
+            turns[i] = kept
+
+        while len(turns) > 1 and estimate_tokens([m for turn in turns for m in turn]) > self.budget:
+            folded.append(turns.pop(0))
+        if folded:
+            summary = self._summarize(summary, folded)
+            self.stats["turns_summarized"] += len(folded)
+            changed = True
+        if not changed:
+            return messages
+
+        compacted = [m for turn in turns for m in turn]
+        if summary:
+            compacted.insert(0, Message(role="system", content=f"{SUMMARY_PREFIX}\n{summary}"))
+        self.stats["compactions"] += 1
+        self.stats["tokens_before"] += before
+        self.stats["tokens_after"] += estimate_tokens(compacted)
+        return compacted
+
+    def snapshot(self) -> Dict[str, float]:
+        compactions = self.stats["compactions"]
+        return {
+            **self.stats,
+            "avg_tokens_before": self.stats["tokens_before"] / compactions if compactions else 0.0,
+            "avg_tokens_after": self.stats["tokens_after"] / compactions if compactions else 0.0,
+        }
+
+memory_compactor = MemoryCompactor()
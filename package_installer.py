@@ -0,0 +1,129 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import importlib
+import importlib.metadata
+from typing import Dict, Iterable, List, Optional
+from turn_events import emit
+from tracing import traced
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:
+    Requirement = None
+
+# Directory of pre-downloaded wheels; when set, pip installs from it without touching the network.
+WHEELHOUSE = os.environ.get("OUROBOROS_WHEELHOUSE")
+MAX_HISTORY = 100
+
+def canonical_name(package: str) -> str:
+    name = re.split(r"[\s\[<>=!~;@]", package.strip(), maxsplit=1)[0]
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def is_satisfied(package: str) -> bool:
+    """
+    True if the requirement is already installed, according to importlib.metadata.
+    """
+    try:
+        installed = importlib.metadata.version(canonical_name(package))
+    except importlib.metadata.PackageNotFoundError:
+        return False
+    if Requirement is None:
+        return True
+    try:
+        return Requirement(package).specifier.contains(installed, prereleases=True)
+    except InvalidRequirement:
+        return True
+
+class PackageInstaller:
+    """
+    Installs pip packages for generated tools without blocking the event loop.
+    Concurrent requests for the same package share one install, and everything
+    missing from a single request goes to pip in one call.
+    """
+    def __init__(self, wheelhouse: Optional[str] = WHEELHOUSE):
+        self.wheelhouse = wheelhouse
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.history: List[dict] = []
+        self.stats: Dict[str, int] = {"requested": 0, "satisfied": 0, "coalesced": 0, "installed": 0, "failed": 0}
+
+    def _command(self, packages: List[str]) -> List[str]:
+        cmd = [sys.executable, "-m", "pip", "install", "--disable-pip-version-check", "--quiet"]
+        if self.wheelhouse:
+            cmd += ["--no-index", "--find-links", self.wheelhouse]
+        return cmd + packages
+
+    @traced("pip.install")
+    async def _pip(self, packages: List[str]) -> Dict[str, bool]:
+        start = time.perf_counter()
+        proc = await asyncio.create_subprocess_exec(
+            *self._command(packages),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        try:
+            output, _ = await proc.communicate()
+        except asyncio.CancelledError:
+            proc.kill()
+            raise
+        elapsed = time.perf_counter() - start
+
+        importlib.invalidate_caches()
+        results = {package: is_satisfied(package) for package in packages}
+        self.history.append({
+            "packages": packages,
+            "returncode": proc.returncode,
+            "seconds": elapsed,
+            "results": results,
+        })
+        del self.history[:-MAX_HISTORY]
+        if proc.returncode != 0:
+            print(f"pip install {' '.join(packages)} failed: {output.decode(errors='replace').strip()}")
+        for package, ok in results.items():
+            self.stats["installed" if ok else "failed"] += 1
+            print(f"{'Successfully installed' if ok else 'Failed to install'} {package}")
+        return results
+
+    async def install(self, packages: Iterable[str]) -> Dict[str, bool]:
+        """
+        Makes sure every package is installed. Returns package -> whether it is now available.
+        """
+        results: Dict[str, bool] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        owned: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+
+        for package in dict.fromkeys(packages):
+            self.stats["requested"] += 1
+            key = canonical_name(package)
+            if is_satisfied(package):
+                self.stats["satisfied"] += 1
+                results[package] = True
+            elif key in self._inflight:
+                self.stats["coalesced"] += 1
+                waiting[package] = self._inflight[key]
+            else:
+                owned[package] = self._inflight[key] = loop.create_future()
+
+        if owned:
+            installed = {package: False for package in owned}
+            try:
+                installed = await self._pip(list(owned))
+            except Exception as e:
+                print(f"pip install failed: {e}")
+            finally:
+                for package, future in owned.items():
+                    self._inflight.pop(canonical_name(package), None)
+                    if not future.done():
+                        future.set_result(installed.get(package, False))
+            results.update(installed)
+
+        for package, future in waiting.items():
+            results[package] = await asyncio.shield(future)
+        for package in list(owned) + list(waiting):
+            emit("package_installed", package=package, ok=results[package])
+        return results
+
+installer = PackageInstaller()
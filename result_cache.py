@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Opt-in: memoize results of generated tools marked cacheable.
+RESULT_CACHE = os.environ.get("OUROBOROS_RESULT_CACHE", "0") != "0"
+RESULT_CACHE_TTL = float(os.environ.get("OUROBOROS_RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_BYTES = int(os.environ.get("OUROBOROS_RESULT_CACHE_MB", "64")) * 1024 * 1024
+# SQLite file shared by every worker; unset keeps results in this process only.
+RESULT_CACHE_DB = os.environ.get("OUROBOROS_RESULT_CACHE_DB")
+
+class ResultStore:
+    """
+    SQLite backend for cached tool results, so workers share each other's results.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, tool TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_tool ON results (tool)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float, bytes]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tool, expires_at, value FROM results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row
+
+    def put(self, key: str, tool: str, value: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, tool, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tool, value, expires_at),
+            )
+            # Expired rows are only ever skipped; clear them out as we go.
+            self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+    def invalidate(self, tool: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results WHERE tool = ?", (tool,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class ResultCache:
+    """
+    LRU + TTL memo of generated tool results keyed by tool name, code hash and arguments,
+    bounded by the pickled size of the stored results. Only tools whose class sets
+    `cacheable` are memoized; a rewritten tool gets a new code hash, so it never sees
+    results of its old code.
+    """
+    def __init__(self, enabled: bool = RESULT_CACHE, ttl: float = RESULT_CACHE_TTL,
+                 max_bytes: int = RESULT_CACHE_BYTES, db_path: Optional[str] = RESULT_CACHE_DB):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.store = ResultStore(db_path) if enabled and db_path else None
+        # key -> (tool name, expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[str, float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "too_large": 0,
+            "evicted": 0,
+            "expired": 0,
+            "invalidated": 0,
+        }
+
+    def applies_to(self, tool) -> bool:
+        return self.enabled and bool(getattr(tool, "cacheable", False))
+
+    def key(self, name: str, code_hash: str, kwargs: Dict[str, Any]) -> str:
+        payload = json.dumps([name, code_hash, kwargs], sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _drop(self, key: str) -> None:
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _remember(self, key: str, name: str, expires_at: float, size: int, value: Any) -> None:
+        if key in self._entries:
+            self._drop(key)
+        while self._entries and self._bytes + size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+        self._entries[key] = (name, expires_at, size, value)
+        self._bytes += size
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Returns (found, result).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            _, expires_at, _, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return True, value
+            self._drop(key)
+            self.stats["expired"] += 1
+        if self.store is not None:
+            row = self.store.get(key)
+            if row is not None:
+                tool, expires_at, blob = row
+                value = pickle.loads(blob)
+                if len(blob) <= self.max_bytes:
+                    self._remember(key, tool, expires_at, len(blob), value)
+                self.stats["disk_hits"] += 1
+                return True, value
+        self.stats["misses"] += 1
+        return False, None
+
+    def put(self, key: str, name: str, value: Any) -> None:
+        try:
+            blob = pickle.dumps(value)
+        except Exception:
+            return
+        if len(blob) > self.max_bytes:
+            self.stats["too_large"] += 1
+            return
+        expires_at = time.time() + self.ttl
+        self._remember(key, name, expires_at, len(blob), value)
+        if self.store is not None:
+            self.store.put(key, name, blob, expires_at)
+        self.stats["stored"] += 1
+
+    def invalidate(self, name: str) -> None:
+        """
+        Forgets every result of a tool, here and in the shared store.
+        """
+        stale = [key for key, entry in self._entries.items() if entry[0] == name]
+        for key in stale:
+            self._drop(key)
+        self.stats["invalidated"] += len(stale)
+        if self.store is not None:
+            self.store.invalidate(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "enabled": self.enabled, "entries": len(self._entries), "bytes": self._bytes}
+
+result_cache = ResultCache()
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+MAX_SESSIONS = int(os.environ.get("OUROBOROS_MAX_SESSIONS", "64"))
+SESSION_IDLE_TTL = float(os.environ.get("OUROBOROS_SESSION_TTL", "1800"))
+SESSION_DB_PATH = os.environ.get("OUROBOROS_SESSION_DB", "sessions.db")
+# Write every session through to SQLite so any worker can serve any session. On by
+# default when running several workers (OUROBOROS_WORKERS > 1).
+SHARED_SESSIONS = os.environ.get(
+    "OUROBOROS_SHARED_SESSIONS", "1" if int(os.environ.get("OUROBOROS_WORKERS", "1")) > 1 else "0"
+) != "0"
+# Seconds a worker waits for another one's write to the database to finish.
+SQLITE_TIMEOUT = 30
+
+class SessionSpill:
+    """
+    SQLite store for the conversation memory of evicted sessions, or of every session when
+    shared between workers. Each save bumps the session's version.
+    """
+    def __init__(self, db_path: str = SESSION_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        # WAL lets other workers keep reading while one of them writes.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    def save(self, session_id: str, messages: List[dict]) -> int:
+        """
+        Stores a session's memory and returns its new version.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, messages, updated_at, version) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (session_id) DO UPDATE SET messages = excluded.messages, "
+                "updated_at = excluded.updated_at, version = sessions.version + 1",
+                (session_id, json.dumps(messages), time.time()),
+            )
+            version = self._conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.commit()
+        return version
+
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row is not None else 0
+
+    def load(self, session_id: str) -> Optional[Tuple[int, List[dict]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, messages FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def pop(self, session_id: str) -> Optional[List[dict]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class SessionStore:
+    """
+    Bounded in-memory map of session_id -> agent with LRU and idle-TTL eviction.
+    Evicted agents have their memory spilled to SQLite and restored on their next request.
+    In shared mode every turn is written through by commit() instead, and a cached agent
+    whose session another worker has since advanced reloads its memory before use.
+    get() reports a miss as None; the caller builds an agent and hands it to add().
+    Database reads and writes run in worker threads, never on the event loop.
+    Agents must provide dump_memory() / load_memory(messages) and a busy flag.
+    """
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_ttl: float = SESSION_IDLE_TTL,
+                 spill: Optional[SessionSpill] = None, shared: bool = SHARED_SESSIONS):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.spill = spill if spill is not None else SessionSpill()
+        self.shared = shared
+        self._sessions: "OrderedDict[str, object]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        # session_id -> version of the stored memory the cached agent holds (shared mode)
+        self._versions: Dict[str, int] = {}
+        # session_id -> spill of an evicted session still being written
+        self._saving: Dict[str, asyncio.Task] = {}
+        # session_id -> restore of a session's stored memory in progress
+        self._adding: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "rehydrated": 0,
+            "resynced": 0,
+            "commits": 0,
+            "evicted_lru": 0,
+            "evicted_idle": 0,
+        }
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get(self, session_id: str):
+        """
+        The session's cached agent, or None (counted as a miss) if it has none, which
+        includes sessions just evicted for being idle.
+        """
+        now = time.monotonic()
+        self.sweep(now)
+        agent = self._sessions.get(session_id)
+        if agent is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = now
+        # A running turn already has the latest memory; commit() will publish it.
+        if self.shared and not getattr(agent, "busy", False):
+            await self._resync(session_id, agent)
+        return agent
+
+    async def add(self, session_id: str, agent):
+        """
+        Caches a freshly built agent for a session after a miss, restoring the session's
+        stored memory into it. If another request added the session meanwhile, that
+        agent is returned instead and this one is dropped.
+        """
+        existing = self._sessions.get(session_id)
+        if existing is not None:
+            return existing
+        # Restores run one at a time per session, or two could each pop half the story.
+        task = self._adding.get(session_id)
+        if task is None:
+            task = asyncio.ensure_future(self._restore(session_id, agent))
+            self._adding[session_id] = task
+            task.add_done_callback(lambda done: self._adding.pop(session_id, None))
+        # Shielded: a caller that goes away does not abandon memory already popped.
+        return await asyncio.shield(task)
+
+    async def _restore(self, session_id: str, agent):
+        if self.shared:
+            stored = await asyncio.to_thread(self._newer, session_id, 0)
+            version = 0
+            if stored is not None:
+                version, messages = stored
+                agent.load_memory(messages)
+                self.stats["rehydrated"] += 1
+            self._versions[session_id] = version
+        else:
+            # An eviction of this session may still be writing it out.
+            pending = self._saving.get(session_id)
+            if pending is not None:
+                await asyncio.wait([pending])
+            messages = await asyncio.to_thread(self.spill.pop, session_id)
+            if messages:
+                agent.load_memory(messages)
+                self.stats["rehydrated"] += 1
+        self._sessions[session_id] = agent
+        self._last_used[session_id] = time.monotonic()
+        self._evict_lru()
+        return agent
+
+    def _newer(self, session_id: str, version: int) -> Optional[Tuple[int, List[dict]]]:
+        # Runs in a worker thread: the stored memory, if it is newer than `version`.
+        if self.spill.version(session_id) <= version:
+            return None
+        return self.spill.load(session_id)
+
+    async def _resync(self, session_id: str, agent) -> None:
+        stored = await asyncio.to_thread(self._newer, session_id, self._versions.get(session_id, 0))
+        # A turn may have started on the agent while the database was read.
+        if stored is None or getattr(agent, "busy", False):
+            return
+        version, messages = stored
+        if version <= self._versions.get(session_id, 0):
+            return
+        agent.load_memory(messages)
+        self.stats["resynced"] += 1
+        self._versions[session_id] = version
+
+    async def commit(self, session_id: str) -> None:
+        """
+        Publishes a session's memory after a turn, in shared mode. Turns on one session
+        running on two workers at once are last-writer-wins.
+        """
+        agent = self._sessions.get(session_id)
+        if not self.shared or agent is None:
+            return
+        try:
+            version = await asyncio.to_thread(self.spill.save, session_id, agent.dump_memory())
+        except Exception as e:
+            print(f"Failed to save session {session_id}: {e}")
+            return
+        self._versions[session_id] = max(version, self._versions.get(session_id, 0))
+        self.stats["commits"] += 1
+
+    async def flush(self) -> None:
+        """
+        Waits for evicted sessions still being written out.
+        """
+        if self._saving:
+            await asyncio.wait(list(self._saving.values()))
+
+    def sweep(self, now: float = None) -> None:
+        """
+        Evicts sessions idle for longer than idle_ttl. Sessions are kept in access order,
+        so the scan stops at the first one that is still fresh.
+        """
+        if self.idle_ttl <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        for session_id in list(self._sessions):
+            if now - self._last_used[session_id] < self.idle_ttl:
+                break
+            if self._evict(session_id):
+                self.stats["evicted_idle"] += 1
+
+    def _evict_lru(self) -> None:
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if self._evict(session_id):
+                self.stats["evicted_lru"] += 1
+
+    def _spilled(self, session_id: str, task: asyncio.Task) -> None:
+        if self._saving.get(session_id) is task:
+            del self._saving[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Failed to spill session {session_id}: {task.exception()}")
+
+    def _evict(self, session_id: str) -> bool:
+        agent = self._sessions[session_id]
+        # Never pull a session out from under a running turn.
+        if getattr(agent, "busy", False):
+            return False
+        # Shared sessions were saved by their last commit(); others are written out in
+        # a worker thread, which add() waits for if the session comes straight back.
+        if not self.shared:
+            task = asyncio.ensure_future(asyncio.to_thread(self.spill.save, session_id, agent.dump_memory()))
+            self._saving[session_id] = task
+            task.add_done_callback(lambda done: self._spilled(session_id, done))
+        del self._sessions[session_id]
+        del self._last_used[session_id]
+        self._versions.pop(session_id, None)
+        return True
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "size": len(self._sessions), "max_sessions": self.max_sessions, "shared": int(self.shared)}
@@ -0,0 +1,91 @@
+import os
+import asyncio
+import tempfile
+from typing import Awaitable, Callable, List, Optional, Tuple
+from spoon_ai.schema import AgentState
+from tool_executor import executor
+
+# Number of candidate generations to request at once per step; 1 keeps the serial loop.
+SPECULATIVE_CANDIDATES = int(os.environ.get("OUROBOROS_SPECULATIVE_CANDIDATES", "1"))
+# Import checks run in the executor's pre-warmed workers and take milliseconds; the timeout
+# only catches drafts that hang at import time.
+SMOKE_TIMEOUT = float(os.environ.get("OUROBOROS_SMOKE_TIMEOUT", "3"))
+
+def syntax_error_message(e: SyntaxError) -> str:
+    return f"Syntax Error: {e.msg}\n" \
+    f"Line: {e.lineno}: {e.text}\n" \
+    f" {' ' * ((e.offset or 1) - 1)}^"
+
+async def smoke_import(code: str, timeout: float = SMOKE_TIMEOUT) -> Optional[str]:
+    """
+    Imports assembled tool code in a pooled worker process. Returns the error, or None if it loads.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "candidate.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+        error = await executor.check(path, timeout)
+    return f"Importing the tool failed: {error}" if error else None
+
+async def validate_candidate(reply: str, assemble: Optional[Callable[[str], str]]) -> Optional[str]:
+    try:
+        compile(reply, '<string>', 'exec')
+    except SyntaxError as e:
+        return syntax_error_message(e)
+    if assemble is None:
+        return None
+    code = assemble(reply)
+    try:
+        compile(code, '<string>', 'exec')
+    except SyntaxError as e:
+        return syntax_error_message(e)
+    return await smoke_import(code)
+
+async def first_valid(produce: Callable[[], Awaitable[str]], validate: Callable[[str], Awaitable[Optional[str]]],
+                      k: int) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Runs k produce() calls concurrently and validates each as it arrives. Returns the first
+    valid candidate (cancelling the rest) and the (candidate, error) pairs that failed.
+    """
+    async def attempt() -> Tuple[str, Optional[str]]:
+        candidate = await produce()
+        return candidate, await validate(candidate)
+
+    tasks = [asyncio.create_task(attempt()) for _ in range(k)]
+    failures: List[Tuple[str, str]] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                candidate, error = await next_done
+            except Exception as e:
+                failures.append(("", str(e)))
+                continue
+            if error is None:
+                return candidate, failures
+            failures.append((candidate, error))
+        return None, failures
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def speculative_step(agent, ask: Callable[[], Awaitable[str]]) -> str:
+    """
+    One code-generation step for ToolGenerationAgent / RetoolAgent that asks for
+    agent.candidates drafts at once and keeps the first that compiles and imports.
+    """
+    reply, failures = await first_valid(
+        ask, lambda candidate: validate_candidate(candidate, agent.assemble), agent.candidates
+    )
+    if reply is not None:
+        agent.code = reply
+        await agent.add_message("assistant", reply)
+        agent.state = AgentState.FINISHED
+        return reply
+
+    # Every draft failed: show the model one of them with its error, as the serial loop does.
+    reply, errorMsg = failures[-1] if failures else ("", "No candidates were generated.")
+    agent.code = reply
+    await agent.add_message("assistant", reply)
+    await agent.add_message("tool", errorMsg)
+    return reply + '\n' + errorMsg
@@ -0,0 +1,109 @@
+from code_repair import CodeRepair, syntax_error
+#test each fix code_repair makes, and that valid code comes through untouched
+
+CODE = '''import re
+
+def count(text, letter):
+    return text.count(letter)
+
+async def run(text, letter):
+    return count(text, letter)'''
+
+
+def repaired(reply):
+    repair = CodeRepair()
+    return repair.repair(reply), repair.stats
+
+
+def test_fences_take_the_defining_block():
+    reply = "Here you go:\n```python\n" + CODE + "\n```\nUsage:\n```python\nprint(count('aa', 'a'))\n```"
+    code, stats = repaired(reply)
+    assert code == CODE
+    assert stats["fix_fences"] == 1
+
+
+def test_unclosed_fence():
+    code, _ = repaired("```py\n" + CODE)
+    assert code == CODE
+
+
+def test_prose_around_unfenced_code():
+    code, stats = repaired("Here is the tool:\n" + CODE + "\n\nLet me know if you need changes.")
+    assert code == CODE
+    assert stats["fix_prose"] == 1
+    assert stats["retries_avoided"] == 1
+
+
+def test_mixed_tabs_and_spaces():
+    reply = "def count(text, letter):\n    n = 0\n\treturn text.count(letter)\n\nasync def run(text, letter):\n    return count(text, letter)"
+    code, stats = repaired(reply)
+    assert syntax_error(code) is None
+    assert "\t" not in code
+    assert stats["fix_tabs"] == 1
+
+
+def test_duplicate_imports():
+    code, stats = repaired("import re\nimport  re\n" + CODE)
+    assert code == CODE
+    assert stats["fix_duplicate_imports"] == 1
+
+
+def test_truncated_last_line():
+    code, stats = repaired(CODE + "\nprint(count(")
+    assert code == CODE
+    assert stats["fix_truncated"] == 1
+
+
+def test_error_before_the_last_line_is_left_for_the_model():
+    reply = "def count(text, letter:\n    return 0\n\nasync def run(text, letter):\n    return count(text, letter)"
+    code, stats = repaired(reply)
+    assert code == reply
+    assert stats["fix_truncated"] == 0
+
+
+def test_sync_run_made_async():
+    code, stats = repaired(CODE.replace("async def run", "def run"))
+    assert code == CODE
+    assert stats["fix_missing_run"] == 1
+
+
+def test_missing_run_wraps_last_public_function():
+    code, _ = repaired("def _helper(x):\n    return x\n\ndef count(text, letter):\n    return text.count(letter)")
+    assert code.endswith("async def run(*args, **kwargs):\n    return count(*args, **kwargs)\n")
+
+
+def test_missing_run_awaits_async_function():
+    code, _ = repaired("async def fetch(url):\n    return url")
+    assert code.endswith("async def run(*args, **kwargs):\n    return await fetch(*args, **kwargs)\n")
+
+
+def test_valid_code_with_comments_untouched():
+    reply = CODE.replace("    return text.count(letter)",
+                         "    # Step 1: normalise the input\n    text = text.lower()\n"
+                         "    # Step 2: count\n    return text.count(letter)") + "\n# install modules: none"
+    code, stats = repaired(reply)
+    assert code == reply
+    assert stats["repaired"] == 0
+
+
+def test_usage_block_untouched():
+    reply = CODE + "\n\nif __name__ == \"__main__\":\n    import asyncio\n    print(asyncio.run(run(\"banana\", \"a\")))"
+    code, stats = repaired(reply)
+    assert code == reply
+    assert stats["repaired"] == 0
+
+
+def test_sync_run_method_untouched():
+    reply = "class Counter:\n    def run(self, text):\n        return len(text)\n\n" \
+            "async def run(text):\n    return Counter().run(text)"
+    code, stats = repaired(reply)
+    assert code == reply
+    assert stats["repaired"] == 0
+
+
+def test_indented_import_untouched():
+    reply = "import json\n\ndef parse(text):\n    import json\n    return json.loads(text)\n\n" \
+            "async def run(text):\n    return parse(text)"
+    code, stats = repaired(reply)
+    assert code == reply
+    assert stats["repaired"] == 0
@@ -0,0 +1,139 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from llm_scheduler import LLMScheduler, LLMOverloaded, USER_PRIORITY, BACKGROUND_PRIORITY
+#test slot ordering, rate limiting and admission of the LLM scheduler
+
+LLM = SimpleNamespace(llm_provider="gemini", model_name="gemini-2.5-pro")
+
+
+async def hold(scheduler, priority, order, name, release):
+    async with scheduler.slot(LLM, priority):
+        order.append(name)
+        await release.wait()
+
+
+async def priority_main():
+    scheduler = LLMScheduler(concurrency=1)
+    order = []
+    release = asyncio.Event()
+    first = asyncio.create_task(hold(scheduler, USER_PRIORITY, order, "first", release))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(hold(scheduler, priority, order, name, release))
+        for name, priority in [("bg1", BACKGROUND_PRIORITY), ("user1", USER_PRIORITY),
+                               ("bg2", BACKGROUND_PRIORITY), ("user2", USER_PRIORITY)]
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.snapshot()["gemini/gemini-2.5-pro"]["waiting"] == 4
+    release.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["first", "user1", "user2", "bg1", "bg2"], order
+
+
+async def token_bucket_main():
+    # 20 calls per second, no burst: the second call waits for the timer, not a release.
+    scheduler = LLMScheduler(concurrency=8, rate=20, burst=1)
+    lane = scheduler._lane(LLM)
+    start = time.monotonic()
+    async with scheduler.slot(LLM):
+        pass
+    assert time.monotonic() - start < 0.04
+    async with scheduler.slot(LLM):
+        assert lane.timer is None
+    assert time.monotonic() - start >= 0.04
+    assert lane.stats["queued"] == 1
+    # The bucket refills up to burst and no further.
+    await asyncio.sleep(0.2)
+    lane._refill()
+    assert lane.tokens == 1
+
+
+async def cancelled_after_grant_main():
+    scheduler = LLMScheduler(concurrency=1)
+    lane = scheduler._lane(LLM)
+    holder = scheduler.slot(LLM)
+    await holder.__aenter__()
+    waiter = asyncio.create_task(hold(scheduler, USER_PRIORITY, [], "waiter", asyncio.Event()))
+    await asyncio.sleep(0)
+    # Releasing grants the slot to the waiter, which is cancelled before it can run.
+    await holder.__aexit__(None, None, None)
+    assert lane.active == 1
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert lane.active == 0
+    assert lane.pending() == 0
+    await asyncio.wait_for(scheduler.slot(LLM).__aenter__(), 1)
+
+
+async def admission_main():
+    # 503 once max_queue calls are waiting.
+    scheduler = LLMScheduler(concurrency=1, max_queue=2)
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(scheduler, USER_PRIORITY, [], i, release)) for i in range(3)]
+    await asyncio.sleep(0)
+    try:
+        scheduler.admit(LLM)
+        raise AssertionError("full queue admitted a turn")
+    except LLMOverloaded as e:
+        assert e.status == 503
+    release.set()
+    await asyncio.gather(*tasks)
+    scheduler.admit(LLM)
+
+    # 429 once the token bucket alone would make a turn wait longer than max_wait.
+    scheduler = LLMScheduler(concurrency=8, rate=0.01, burst=1, max_wait=30)
+    scheduler.admit(LLM)
+    async with scheduler.slot(LLM):
+        pass
+    try:
+        scheduler.admit(LLM)
+        raise AssertionError("rate limited lane admitted a turn")
+    except LLMOverloaded as e:
+        assert e.status == 429
+        assert 99 <= e.retry_after <= 100, e.retry_after
+
+    # Or once busy slots would, going by the average call duration.
+    scheduler = LLMScheduler(concurrency=1, max_wait=5)
+    lane = scheduler._lane(LLM)
+    async with scheduler.slot(LLM):
+        lane.avg_seconds = 1.0
+        scheduler.admit(LLM)
+        lane.avg_seconds = 10.0
+        try:
+            scheduler.admit(LLM)
+            raise AssertionError("slow lane admitted a turn")
+        except LLMOverloaded as e:
+            assert e.status == 429
+            assert e.retry_after == 10
+    assert scheduler.snapshot()["gemini/gemini-2.5-pro"]["rejected_rate_limited"] == 1
+
+
+def test_priority_order():
+    asyncio.run(priority_main())
+
+
+def test_token_bucket():
+    asyncio.run(token_bucket_main())
+
+
+def test_cancelled_after_grant():
+    asyncio.run(cancelled_after_grant_main())
+
+
+def test_admission():
+    asyncio.run(admission_main())
+
+
+def test_lane_limits():
+    scheduler = LLMScheduler(concurrency=8, limits="gemini/gemini-2.5-pro=2,gemini=6")
+    assert scheduler._lane(LLM).limit == 2
+    assert scheduler._lane(SimpleNamespace(llm_provider="gemini", model_name="flash")).limit == 6
+    assert scheduler._lane(SimpleNamespace(llm_provider="openai", model_name="gpt")).limit == 8
+
+
+if __name__ == "__main__":
+    asyncio.run(priority_main())
+    asyncio.run(token_bucket_main())
+    asyncio.run(cancelled_after_grant_main())
+    asyncio.run(admission_main())
@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+import tempfile
+# Keep this test's bytecode out of the repo's generated-tools/.bytecode.
+os.environ.setdefault("OUROBOROS_BYTECODE_DIR", tempfile.mkdtemp(prefix="ouroboros-bytecode-"))
+from tool_executor import ToolExecutor
+from dynamic_tool_loader import load_module, instantiate_tools
+#test that a killed worker frees its slot
+
+TOOL = '''
+import time
+from spoon_ai.tools.base import BaseTool
+
+async def run(seconds):
+    time.sleep(seconds)
+    return seconds
+
+class SleepTool(BaseTool):
+    name: str = "sleep"
+    description: str = "Sleeps for a number of seconds"
+    parameters: dict = {"type": "object", "properties": {"seconds": {"type": "number"}}}
+
+    async def execute(self, seconds: float) -> float:
+        return await run(seconds)
+'''
+
+
+async def main():
+    tools_dir = tempfile.mkdtemp(prefix="ouroboros-executor-")
+    path = os.path.join(tools_dir, "SleepTool.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(TOOL)
+    tool = instantiate_tools(load_module(path, path))[0]
+
+    # One worker: the call after a timeout has to get a replacement rather than wait forever.
+    executor = ToolExecutor(mode="process", size=1, timeout=1)
+    try:
+        await executor.warm()
+        try:
+            await executor.run(tool, {"seconds": 10})
+            raise AssertionError("slow call did not time out")
+        except TimeoutError:
+            pass
+        start = time.perf_counter()
+        result = await asyncio.wait_for(executor.run(tool, {"seconds": 0}), 10)
+        assert result == 0, result
+        print(f"call after timeout took {time.perf_counter() - start:.2f}s")
+
+        # Same with several callers queued behind the runaway one.
+        slow = asyncio.ensure_future(executor.run(tool, {"seconds": 10}))
+        await asyncio.sleep(0.1)
+        waiting = [executor.run(tool, {"seconds": 0}) for _ in range(3)]
+        results = await asyncio.wait_for(asyncio.gather(*waiting), 20)
+        assert results == [0, 0, 0], results
+        try:
+            await slow
+        except TimeoutError:
+            pass
+        assert await executor.check(path) is None
+        print(executor.stats)
+    finally:
+        executor.shutdown()
+
+
+async def thread_main():
+    tools_dir = tempfile.mkdtemp(prefix="ouroboros-executor-")
+    path = os.path.join(tools_dir, "SleepTool.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(TOOL)
+    tool = instantiate_tools(load_module(path, path))[0]
+
+    # Threads cannot be killed: hung calls must not leave later ones without a thread.
+    executor = ToolExecutor(mode="thread", size=1, timeout=0.5)
+    try:
+        for _ in range(4):
+            try:
+                await executor.run(tool, {"seconds": 3})
+                raise AssertionError("slow call did not time out")
+            except TimeoutError:
+                pass
+        start = time.perf_counter()
+        assert await executor.run(tool, {"seconds": 0}) == 0
+        print(f"thread call after 4 hung calls took {time.perf_counter() - start:.2f}s")
+        assert executor.stats["threads_abandoned"] == 4, executor.stats
+    finally:
+        executor.shutdown()
+
+
+def test_call_after_timeout():
+    asyncio.run(main())
+
+
+def test_thread_call_after_hung_calls():
+    asyncio.run(thread_main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    asyncio.run(thread_main())
@@ -1,4 +1,5 @@
 from generation_tool import GenerationTool
+from tool_registry import registry
 from spoon_ai.chat import ChatBot
 import asyncio
 import sys
@@ -9,8 +10,8 @@ Shuffles every letter in a string.
 """
 
 async def main():
-    agent = GenerationTool(ChatBot(model_name="gemini-2.5-pro", llm_provider="gemini", temperature=0.1))
-    response = await agent.execute(f"name: \"souffle\", description: \"{PROBLEM_DESC}\", input: \"input: str\", output: \"output: str\"", "souffleTool")
+    agent = GenerationTool(ChatBot(model_name="gemini-2.5-pro", llm_provider="gemini", temperature=0.1), registry.view())
+    response = await agent.execute("souffle", PROBLEM_DESC.strip(), "input: str", "output: str", "souffleTool")
     return response
 
 async def balls():
@@ -0,0 +1,351 @@
+import os
+import sys
+import asyncio
+import inspect
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from spoon_ai.tools.base import BaseTool
+from dynamic_tool_loader import PACKAGE_NAME, load_module, instantiate_tools, module_name
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# inline: run on the event loop as before; thread: worker threads; process: worker processes.
+EXECUTION_MODE = os.environ.get("OUROBOROS_TOOL_EXECUTION", "process")
+TOOL_TIMEOUT = float(os.environ.get("OUROBOROS_TOOL_TIMEOUT", "30"))
+POOL_SIZE = int(os.environ.get("OUROBOROS_TOOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+WORKER_MAX_CALLS = int(os.environ.get("OUROBOROS_WORKER_MAX_CALLS", "100"))
+WORKER_MEMORY_MB = int(os.environ.get("OUROBOROS_WORKER_MEMORY_MB", "1024"))
+MODES = ("inline", "thread", "process")
+
+def tool_target(tool: BaseTool) -> Tuple[str, str]:
+    """
+    The (file, class name) a worker needs to rebuild a generated tool on its side.
+    """
+    if hasattr(tool, "tool_path") and hasattr(tool, "class_name"):
+        return tool.tool_path, tool.class_name
+    return inspect.getfile(type(tool)), type(tool).__name__
+
+def _limit_memory(memory_mb: int) -> None:
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _check(tool_path: str) -> Optional[str]:
+    # Imports a tool file without keeping it: the module is dropped again afterwards, and
+    # its bytecode never reaches the shared cache.
+    try:
+        module = load_module(tool_path, tool_path, cache=False)
+        if not callable(getattr(module, "run", None)):
+            raise AttributeError("no run() function defined")
+        if not instantiate_tools(module):
+            raise TypeError("no tool class could be instantiated")
+        return None
+    except ModuleNotFoundError:
+        return None  # dependencies are installed after the code is accepted
+    except BaseException as e:
+        return f"{type(e).__name__}: {e}"
+    finally:
+        sys.modules.pop(module_name(tool_path), None)
+        package = sys.modules.get(PACKAGE_NAME)
+        tools_dir = os.path.dirname(os.path.abspath(tool_path))
+        if package is not None and tools_dir in package.__path__:
+            package.__path__.remove(tools_dir)
+
+def _worker_main(conn, memory_mb: int) -> None:
+    _limit_memory(memory_mb)
+    loop = asyncio.new_event_loop()
+    # (path, class) -> (mtime_ns, tool) so rebuilt files are picked up
+    tools: Dict[Tuple[str, str], Tuple[int, BaseTool]] = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        if msg[0] == "check":
+            conn.send(_check(msg[1]))
+            continue
+        _, tool_path, class_name, kwargs = msg
+        try:
+            mtime_ns = os.stat(tool_path).st_mtime_ns
+            cached = tools.get((tool_path, class_name))
+            if cached is None or cached[0] != mtime_ns:
+                module = load_module(tool_path, tool_path)
+                cached = tools[(tool_path, class_name)] = (mtime_ns, getattr(module, class_name)())
+            result = loop.run_until_complete(cached[1].execute(**kwargs))
+            reply = (True, result)
+        except BaseException as e:
+            reply = (False, f"{type(e).__name__}: {e}")
+        try:
+            conn.send(reply)
+        except Exception:
+            # Unpicklable results still reach the agent as text.
+            conn.send((reply[0], str(reply[1])))
+
+_start_lock = threading.Lock()
+
+@contextmanager
+def _starting_child():
+    # A new fork server (or spawned child) re-runs the parent's __main__ first, which under
+    # `python main.py` is the whole app. Workers only need this module, so hide it. The
+    # fork server ignores the parent's sys.path, so it finds this module via PYTHONPATH.
+    main = sys.modules.get("__main__")
+    with _start_lock:
+        saved_file = getattr(main, "__file__", None)
+        saved_spec = getattr(main, "__spec__", None)
+        saved_path = os.environ.get("PYTHONPATH")
+        if saved_file is not None:
+            del main.__file__
+        main.__spec__ = None
+        here = os.path.dirname(os.path.abspath(__file__))
+        os.environ["PYTHONPATH"] = os.pathsep.join(p for p in (here, saved_path) if p)
+        try:
+            yield
+        finally:
+            main.__spec__ = saved_spec
+            if saved_file is not None:
+                main.__file__ = saved_file
+            if saved_path is None:
+                del os.environ["PYTHONPATH"]
+            else:
+                os.environ["PYTHONPATH"] = saved_path
+
+def _mp_context():
+    # spawn/fork-server rather than fork: the server process has threads running. The fork
+    # server preloads this module (and with it spoon_ai), so each worker forked from it
+    # starts with the heavy imports already done.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+def _start_server(ctx) -> None:
+    if ctx.get_start_method() == "forkserver":
+        from multiprocessing import forkserver
+        with _starting_child():
+            forkserver.ensure_running()
+
+def _run_in_thread(tool: BaseTool, kwargs: Dict[str, Any]) -> Any:
+    return asyncio.run(tool.execute(**kwargs))
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_mb), daemon=True)
+        with _starting_child():
+            self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.conn.close()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+class ToolExecutor:
+    """
+    Runs generated tools away from the event loop so blocking or CPU-heavy generated
+    code cannot stall other chats. Process workers get a hard per-call timeout, are
+    killed when the caller is cancelled, run under a memory limit and are recycled
+    after max_calls. Thread mode (for tools marked I/O-bound) bounds wait time but
+    cannot stop a runaway call: its thread is abandoned to a retired pool instead, so
+    hung calls never use up the threads later calls need. At most `size` process calls
+    and `size` thread calls run at once; a killed worker or abandoned thread frees its
+    slot for a fresh one.
+    """
+    def __init__(self, mode: str = EXECUTION_MODE, size: int = POOL_SIZE, timeout: float = TOOL_TIMEOUT,
+                 max_calls: int = WORKER_MAX_CALLS, memory_mb: int = WORKER_MEMORY_MB):
+        if mode not in MODES:
+            raise ValueError(f"Unknown tool execution mode {mode!r}; expected one of {MODES}")
+        self.mode = mode
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_calls = max_calls
+        self.memory_mb = memory_mb
+        self._ctx = _mp_context()
+        self._idle: asyncio.Queue = None
+        self._slots: asyncio.Semaphore = None
+        self._thread_slots: asyncio.Semaphore = None
+        self._spawned = 0
+        self._threads = self._new_threads()
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "crashed": 0,
+            "recycled": 0,
+            "spawned": 0,
+            "threads_abandoned": 0,
+            "checks": 0,
+        }
+
+    def mode_for(self, tool: BaseTool) -> str:
+        # Generated tools may mark themselves with `execution`; "inline" overrides everything.
+        if self.mode == "inline":
+            return "inline"
+        mode = getattr(tool, "execution", "") or self.mode
+        return mode if mode in MODES else self.mode
+
+    async def run(self, tool: BaseTool, kwargs: Dict[str, Any]) -> Any:
+        self.stats["calls"] += 1
+        mode = self.mode_for(tool)
+        try:
+            if mode == "process":
+                return await self._run_process(tool, kwargs)
+            if mode == "thread":
+                return await self._run_thread(tool, kwargs)
+            return await asyncio.wait_for(tool.execute(**kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise TimeoutError(f"Tool {tool.name} timed out after {self.timeout}s")
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+
+    async def _spawn(self) -> _Worker:
+        self._spawned += 1
+        try:
+            worker = await asyncio.to_thread(_Worker, self._ctx, self.memory_mb)
+        except BaseException:
+            self._spawned -= 1
+            raise
+        self.stats["spawned"] += 1
+        return worker
+
+    def _pool(self) -> None:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.size)
+            self._thread_slots = asyncio.Semaphore(self.size)
+
+    def _new_threads(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="tool")
+
+    async def _run_thread(self, tool: BaseTool, kwargs: Dict[str, Any]) -> Any:
+        # Slots keep calls from queueing inside the thread pool, where they would wait
+        # behind a hung call however many threads were retired.
+        self._pool()
+        await self._thread_slots.acquire()
+        try:
+            threads = self._threads
+            future = threads.submit(_run_in_thread, tool, kwargs)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                if not future.done():
+                    # A thread cannot be killed: leave it running on a retired pool and
+                    # give later calls fresh threads.
+                    self.stats["threads_abandoned"] += 1
+                    if threads is self._threads:
+                        self._threads = self._new_threads()
+                        threads.shutdown(wait=False)
+                raise
+        finally:
+            self._thread_slots.release()
+
+    async def _acquire(self) -> _Worker:
+        # The slot, not the worker, is what callers wait for: a killed worker gives its
+        # slot back and the next caller spawns a replacement.
+        self._pool()
+        await self._slots.acquire()
+        try:
+            if not self._idle.empty():
+                return self._idle.get_nowait()
+            return await self._spawn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def warm(self) -> None:
+        """
+        Starts the fork server, and in process mode the worker pool, ahead of the first
+        tool call or import check.
+        """
+        await asyncio.to_thread(_start_server, self._ctx)
+        if self.mode != "process":
+            return
+        self._pool()
+        while self._spawned < self.size:
+            self._idle.put_nowait(await self._spawn())
+
+    def _discard(self, worker: _Worker, kill: bool = False) -> None:
+        self._spawned -= 1
+        worker.kill() if kill else worker.close()
+
+    def _release(self, worker: _Worker) -> None:
+        worker.calls += 1
+        if worker.calls >= self.max_calls or not worker.process.is_alive():
+            self.stats["recycled"] += 1
+            self._discard(worker)
+        else:
+            self._idle.put_nowait(worker)
+
+    async def _call(self, message: tuple, timeout: float) -> Any:
+        # Sends one message to a pooled worker and waits up to timeout for its reply.
+        # Raises EOFError/OSError if the worker died.
+        worker = await self._acquire()
+        try:
+            worker.conn.send(message)
+            reply = await asyncio.wait_for(asyncio.to_thread(worker.conn.recv), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # The only way to stop a runaway call is to kill its worker.
+            self._discard(worker, kill=True)
+            raise
+        except (EOFError, OSError):
+            self.stats["crashed"] += 1
+            self._discard(worker, kill=True)
+            raise
+        else:
+            self._release(worker)
+        finally:
+            self._slots.release()
+        return reply
+
+    async def check(self, tool_path: str, timeout: float = TOOL_TIMEOUT) -> Optional[str]:
+        """
+        Imports a tool file in a pooled worker and instantiates its tools, without
+        registering anything. Returns the error, or None if the file loads.
+        """
+        self.stats["checks"] += 1
+        try:
+            return await self._call(("check", tool_path), timeout)
+        except asyncio.TimeoutError:
+            return f"Importing the tool did not finish within {timeout}s"
+        except (EOFError, OSError):
+            return "Importing the tool crashed its process (or hit the memory limit)"
+
+    async def _run_process(self, tool: BaseTool, kwargs: Dict[str, Any]) -> Any:
+        tool_path, class_name = tool_target(tool)
+        try:
+            ok, value = await self._call(("run", tool_path, class_name, kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            raise  # a subclass of OSError since Python 3.11
+        except (EOFError, OSError):
+            raise RuntimeError(f"Tool {tool.name} worker died (crashed or hit its memory limit)")
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def shutdown(self) -> None:
+        while self._idle is not None and not self._idle.empty():
+            self._discard(self._idle.get_nowait())
+        self._threads.shutdown(wait=False)
+
+executor = ToolExecutor()
@@ -1,8 +1,7 @@
-from spoon_ai.agents.base import BaseAgent
 from spoon_ai.chat import ChatBot
-from spoon_ai.schema import AgentState
+from code_generation_agent import CodeGenerationAgent
 
-class ToolGenerationAgent(BaseAgent):
+class ToolGenerationAgent(CodeGenerationAgent):
     def __init__(self, llm:ChatBot):
         super().__init__(name="john", llm=llm, system_prompt="You are a tool generation agent. " \
         "You are given a description of a tool and you need to generate the tool. " \
@@ -13,21 +12,3 @@ class ToolGenerationAgent(BaseAgent):
         "Your run code should only take string inputs. If necessary, parse the input before running it through any logic." \
         "You are permitted to import non standard pip modules. To do so, list pip modules in a commment at the end of your code output in a space separated list beginning with \"install modules:\"" \
         "If ever you have to query an external API, prefer pip modules to manual http requests.")
-        self.max_steps=5
-
-    async def step(self, run_id=None) -> str:
-        reply = await self.llm.ask(system_msg = self.system_prompt, messages = self.memory.messages)
-        reply = reply.strip("```").removeprefix("python")
-
-        await self.add_message("assistant", reply)
-
-        try: 
-            compile(reply, '<string>', 'exec')
-            self.state = AgentState.FINISHED
-            return reply
-        except SyntaxError as e:
-            errorMsg = f"Syntax Error: {e.msg}\n" \
-            f"Line: {e.lineno}: {e.text}\n" \
-            f" {' ' * (e.offset - 1)}^"
-            await self.add_message("tool", errorMsg)
-            return reply + '\n' + errorMsg
@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import ChainMap
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from spoon_ai.tools.tool_manager import ToolManager
+from spoon_ai.tools.base import BaseTool, ToolFailure
+from dynamic_tool_loader import load_module, instantiate_tools, lazy_tools, read_tool_specs
+from tool_executor import executor, tool_target
+from tool_retrieval import ToolRetriever, TOOL_TOP_K
+from result_cache import result_cache
+from tracing import span
+
+TOOLS_DIR = os.path.join(os.getcwd(), "generated-tools")
+# Register generated tools from their statically read schemas and import them on first use.
+LAZY_TOOLS = os.environ.get("OUROBOROS_LAZY_TOOLS", "1") != "0"
+# Seconds between scans of generated-tools for files written by other workers; 0 disables.
+TOOL_POLL_INTERVAL = float(os.environ.get("OUROBOROS_TOOL_POLL", "2"))
+INDEX_NAME = ".index.json"
+# Coarse filesystem clocks can give an in-place edit the mtime of the version before it,
+# so files modified this recently are hashed rather than trusted by (mtime, size).
+MTIME_SETTLE_NS = 2_000_000_000
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+@contextmanager
+def tool_file_lock(path: str):
+    """
+    Exclusive lock on `<path>.lock`, held across processes while a tool file is rewritten.
+    """
+    with open(f"{path}.lock", "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class ToolRegistry:
+    """
+    Process-wide set of generated tools. Each module is imported once and shared by
+    every session; sessions see it through a ToolView instead of their own copies.
+    An index of path -> (mtime, size, sha256, classes, specs) persisted next to the
+    tools lets refresh() skip unchanged files without reading them.
+    """
+    def __init__(self, tools_dir: str = TOOLS_DIR, lazy: bool = LAZY_TOOLS):
+        self.tools_dir = tools_dir
+        self.lazy = lazy
+        # Replaced wholesale on every change so readers never see a dict mid-update.
+        self.tool_map: Dict[str, BaseTool] = {}
+        # path -> (sha256, tool names) for the files registered in this process
+        self._loaded: Dict[str, Tuple[str, List[str]]] = {}
+        self._index: Dict[str, dict] = self._read_index()
+        # Ranks tools for ToolView.to_params; kept in step with tool_map by _apply.
+        self.retriever = ToolRetriever()
+        self._lock = threading.RLock()
+        self._scanned = False
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.tools_dir, INDEX_NAME)
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self) -> None:
+        # Other workers read this file concurrently, so never leave it half written.
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with self._lock:
+                index = dict(self._index)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Failed to write tool index: {e}")
+
+    def _entry(self, path: str, trust_mtime: bool = True) -> dict:
+        st = os.stat(path)
+        cached = self._index.get(path)
+        settled = time.time_ns() - st.st_mtime_ns > MTIME_SETTLE_NS
+        if trust_mtime and settled and cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            return cached
+        sha256 = file_hash(path)
+        if cached and cached["sha256"] == sha256:
+            return {**cached, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        specs = read_tool_specs(path) if self.lazy else None
+        return {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": sha256,
+            "classes": [spec["class_name"] for spec in specs] if specs is not None else [],
+            "specs": specs,
+        }
+
+    def _instantiate(self, path: str, entry: dict) -> List[BaseTool]:
+        if self.lazy and entry["specs"] is not None:
+            return lazy_tools(path, entry["specs"])
+        tools = instantiate_tools(load_module(path, os.path.basename(path)))
+        entry["classes"] = [type(tool).__name__ for tool in tools]
+        return tools
+
+    def _apply(self, built: Dict[str, Tuple[dict, List[BaseTool]]], removed: List[str]) -> None:
+        with self._lock:
+            tool_map = dict(self.tool_map)
+            dropped = []
+            for path in removed + list(built):
+                for name in self._loaded.get(path, ("", []))[1]:
+                    tool_map.pop(name, None)
+                    dropped.append(name)
+            for path in removed:
+                self._loaded.pop(path, None)
+                self._index.pop(path, None)
+            for path, (entry, tools) in built.items():
+                for tool in tools:
+                    tool_map[tool.name] = tool
+                self._loaded[path] = (entry["sha256"], [tool.name for tool in tools])
+                self._index[path] = entry
+            self.tool_map = tool_map
+            self.retriever.update([tool for _, tools in built.values() for tool in tools], dropped)
+
+    def load_all(self) -> None:
+        with self._lock:
+            if self._scanned:
+                return
+            self._scanned = True
+        self.refresh()
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """
+        Brings the registry in line with tools_dir: imports added or changed files and
+        unregisters deleted ones in a single swap. Safe to call from a worker thread.
+        Returns the paths that were added, changed and removed.
+        """
+        paths = set()
+        if os.path.isdir(self.tools_dir):
+            for file in os.listdir(self.tools_dir):
+                if file.endswith(".py"):
+                    paths.add(os.path.abspath(os.path.join(self.tools_dir, file)))
+
+        changes = {"added": [], "changed": [], "removed": []}
+        built = {}
+        index_dirty = False
+        for path in sorted(paths):
+            try:
+                entry = self._entry(path)
+            except (OSError, SyntaxError) as e:
+                print(e)
+                continue
+            fresh = entry is not self._index.get(path)
+            index_dirty = index_dirty or fresh
+            loaded = self._loaded.get(path)
+            if loaded and loaded[0] == entry["sha256"]:
+                if fresh:
+                    with self._lock:
+                        self._index[path] = entry
+                continue
+            print(f"Loading {path}")
+            try:
+                built[path] = (entry, self._instantiate(path, entry))
+            except Exception as e:
+                print(e)
+                continue
+            changes["changed" if loaded else "added"].append(path)
+
+        with self._lock:
+            removed = [path for path in self._loaded if path not in paths]
+            index_dirty = index_dirty or any(path not in paths for path in self._index)
+            for path in [path for path in self._index if path not in paths]:
+                self._index.pop(path, None)
+        changes["removed"] = removed
+        if built or removed:
+            self._apply(built, removed)
+        if index_dirty or removed:
+            self._write_index()
+        return changes
+
+    def poll(self) -> Dict[str, List[str]]:
+        """
+        refresh() for the tool watcher. Unchanged files cost one stat each against the
+        index, so files edited in place (not just renamed in) are picked up as well.
+        """
+        return self.refresh()
+
+    def load(self, tool_path: str) -> List[str]:
+        """
+        (Re)imports a generated tool file and publishes its tools to every session.
+        Returns the names of the tools it defines.
+        """
+        tool_path = os.path.abspath(tool_path)
+        print(f"Loading {tool_path}")
+        try:
+            # The file was just written; mtime granularity may not tell it apart.
+            entry = self._entry(tool_path, trust_mtime=False)
+            tools = self._instantiate(tool_path, entry)
+        except Exception as e:
+            print(e)
+            return []
+        self._apply({tool_path: (entry, tools)}, [])
+        self._write_index()
+        return [tool.name for tool in tools]
+
+    def code_hash(self, tool: BaseTool) -> str:
+        path = os.path.abspath(tool_target(tool)[0])
+        return self._loaded.get(path, ("", []))[0]
+
+    def view(self, tools: Iterable[BaseTool] = ()) -> "ToolView":
+        return ToolView(self, tools)
+
+class ToolWatcher:
+    """
+    Polls generated-tools and hot-reloads whatever changed, so tools written by other
+    workers show up without a restart. Scans run in a thread off the event loop.
+    """
+    def __init__(self, registry: ToolRegistry, interval: float = TOOL_POLL_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self._task: asyncio.Task = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                changes = await asyncio.to_thread(self.registry.poll)
+            except Exception as e:
+                print(f"Tool refresh failed: {e}")
+                continue
+            if any(changes.values()):
+                print(f"Tools reloaded: {', '.join(f'{k}={len(v)}' for k, v in changes.items())}")
+
+class ToolView(ToolManager):
+    """
+    Per-session ToolManager layered over the shared registry. Tools added here shadow
+    shared ones for this session only; the shared layer is never copied.
+    Once focus() is called, only the most relevant shared tools are offered to the model.
+    """
+    def __init__(self, registry: ToolRegistry, tools: Iterable[BaseTool] = ()):
+        self.registry = registry
+        self._local: Dict[str, BaseTool] = {}
+        # Names this session published to the registry, in order.
+        self.published: List[str] = []
+        self.top_k = TOOL_TOP_K
+        self._query: Optional[str] = None
+        self._pinned: List[str] = []
+        super().__init__(list(tools))
+
+    @property
+    def tool_map(self):
+        return ChainMap(self._local, self.registry.tool_map)
+
+    @tool_map.setter
+    def tool_map(self, value) -> None:
+        self._local = dict(value)
+
+    @property
+    def tools(self) -> List[BaseTool]:
+        return list(self.tool_map.values())
+
+    @tools.setter
+    def tools(self, value) -> None:
+        self._local = {tool.name: tool for tool in value}
+
+    def reindex(self) -> None:
+        # tool_map is always live; rebuilding it from tools would copy the shared layer.
+        pass
+
+    def add_tool(self, tool: BaseTool) -> None:
+        self._local[tool.name] = tool
+
+    def focus(self, query: str, pinned: Iterable[str] = ()) -> None:
+        """
+        Narrows what to_params() offers to this session's own tools, the pinned ones and
+        the top_k shared tools that best match the query.
+        """
+        self._query = query
+        self._pinned = list(pinned)
+
+    def to_params(self) -> List[Dict[str, Any]]:
+        shared = self.registry.tool_map
+        if self._query is None or self.top_k <= 0 or len(shared) <= self.top_k:
+            return super().to_params()
+        tool_map = self.tool_map
+        names = dict.fromkeys(self._local)
+        names.update(dict.fromkeys(self._pinned))
+        names.update(dict.fromkeys(self.registry.retriever.search(self._query, self.top_k)))
+        tools = [tool_map[name] for name in names if name in tool_map]
+        self.registry.retriever.record(len(tools), len(tool_map))
+        return [tool.to_param() for tool in tools]
+
+    def remove_tool(self, name: str) -> None:
+        self._local.pop(name, None)
+
+    async def execute(self, *, name: str, tool_input: Dict[str, Any] = None):
+        # Generated tools run through the executor; session-local tools stay inline.
+        if name in self._local or name not in self.registry.tool_map:
+            return await super().execute(name=name, tool_input=tool_input)
+        tool = self.registry.tool_map[name]
+        key = None
+        if result_cache.applies_to(tool):
+            key = result_cache.key(name, self.registry.code_hash(tool), tool_input or {})
+            found, result = result_cache.get(key)
+            if found:
+                return result
+        try:
+            with span("tool.execute", tool=name):
+                result = await executor.run(tool, tool_input or {})
+        except Exception as e:
+            return ToolFailure(f"Tool '{name}' execution failed: {str(e)}")
+        if key is not None:
+            result_cache.put(key, name, result)
+        return result
+
+    def publish(self, tool_path: str) -> List[str]:
+        names = self.registry.load(tool_path)
+        self.published.extend(names)
+        return names
+
+registry = ToolRegistry()
@@ -0,0 +1,110 @@
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List
+from spoon_ai.tools.base import BaseTool
+
+# Generated tools offered to the model per step, besides the session's own tools
+# (generation_tool, retool); 0 offers every tool.
+TOOL_TOP_K = int(os.environ.get("OUROBOROS_TOOL_TOP_K", "16"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A tool's name says more about it than any one word of its description.
+NAME_WEIGHT = 3
+
+TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it its me my of on or that the this "
+    "to use what when which with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    # Splits snake_case and CamelCase too, so "count_letters" matches "letters".
+    return [t for t in (m.lower() for m in TOKEN_RE.findall(text or "")) if t not in STOPWORDS]
+
+def tool_text(tool: BaseTool) -> List[str]:
+    terms = tokenize(tool.name) * NAME_WEIGHT + tokenize(tool.description)
+    properties = (getattr(tool, "parameters", None) or {}).get("properties", {})
+    for name, schema in properties.items():
+        terms += tokenize(name)
+        if isinstance(schema, dict):
+            terms += tokenize(schema.get("description", ""))
+    return terms
+
+class ToolRetriever:
+    """
+    BM25 index over tool names, descriptions and parameters. Tools are added and removed
+    one at a time as the registry changes, so lookups never rebuild anything.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self.stats: Dict[str, int] = {"searches": 0, "tools_offered": 0, "tools_skipped": 0}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _remove(self, name: str) -> None:
+        terms = self._docs.pop(name, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(name)
+        for term in terms:
+            posting = self._postings[term]
+            posting.pop(name, None)
+            if not posting:
+                del self._postings[term]
+
+    def update(self, added: Iterable[BaseTool] = (), removed: Iterable[str] = ()) -> None:
+        with self._lock:
+            for name in removed:
+                self._remove(name)
+            for tool in added:
+                self._remove(tool.name)
+                terms = Counter(tool_text(tool))
+                self._docs[tool.name] = terms
+                self._lengths[tool.name] = sum(terms.values())
+                self._total_length += self._lengths[tool.name]
+                for term, count in terms.items():
+                    self._postings.setdefault(term, {})[tool.name] = count
+
+    def search(self, query: str, k: int) -> List[str]:
+        """
+        Names of the k tools best matching the query, best first. Tools sharing no
+        term with the query are never returned.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+            scores: Dict[str, float] = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for name, tf in posting.items():
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[name] / avg_length)
+                    scores[name] = scores.get(name, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores, key=lambda name: (-scores[name], name))[:k]
+
+    def record(self, offered: int, total: int) -> None:
+        self.stats["searches"] += 1
+        self.stats["tools_offered"] += offered
+        self.stats["tools_skipped"] += total - offered
+
+    def snapshot(self) -> Dict[str, float]:
+        searches = self.stats["searches"]
+        return {
+            **self.stats,
+            "indexed": len(self._docs),
+            "terms": len(self._postings),
+            "avg_tools_offered": self.stats["tools_offered"] / searches if searches else 0.0,
+        }
@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import time
+import uuid
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Span timings feed the /metrics histograms; set to 0 to make every span a no-op.
+TRACING = os.environ.get("OUROBOROS_TRACING", "1") != "0"
+# When set, every traced request's spans are written to <dir>/<request id>.json.
+TRACE_DIR = os.environ.get("OUROBOROS_TRACE_DIR")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+class Metrics:
+    """
+    Latency histograms per span name, rendered in the Prometheus text format.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+
+    def observe(self, name: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+            histogram.errors += error
+
+    def render(self, gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """
+        Text exposition of the span histograms plus the given {group: {name: value}} stats.
+        """
+        lines = [
+            "# HELP ouroboros_span_seconds Time spent in each instrumented stage.",
+            "# TYPE ouroboros_span_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {name: (list(h.counts), h.sum, h.count, h.errors) for name, h in self.histograms.items()}
+        for name, (counts, total, count, _) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                lines.append(f'ouroboros_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'ouroboros_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'ouroboros_span_seconds_sum{{span="{name}"}} {total}')
+            lines.append(f'ouroboros_span_seconds_count{{span="{name}"}} {count}')
+        lines.append("# HELP ouroboros_span_errors_total Spans that ended with an exception.")
+        lines.append("# TYPE ouroboros_span_errors_total counter")
+        for name, (_, _, _, errors) in sorted(histograms.items()):
+            lines.append(f'ouroboros_span_errors_total{{span="{name}"}} {errors}')
+        for group, values in (gauges or {}).items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    metric = f"ouroboros_{group}_{key}"
+                    lines.append(f"# TYPE {metric} gauge")
+                    lines.append(f"{metric} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+# The trace of the request being handled, when trace dumps are on.
+_trace: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("trace", default=None)
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: Dict[str, Any]):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        metrics.observe(self.name, elapsed, exc_type is not None)
+        record = _trace.get()
+        if record is not None:
+            record["spans"].append({
+                "span": self.name,
+                "start": self.start - record["t0"],
+                "seconds": elapsed,
+                "error": exc_type.__name__ if exc_type is not None else None,
+                **self.labels,
+            })
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name: str, **labels: Any):
+    """
+    Times a block as a named stage: `with span("llm.ask", agent=...):`.
+    """
+    if not TRACING:
+        return _NO_SPAN
+    return _Span(name, labels)
+
+def traced(name: str):
+    """
+    Decorator form of span() for plain and async functions. With tracing off the
+    function is returned untouched.
+    """
+    def decorate(fn):
+        if not TRACING:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Span(name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def request_id(value: Optional[str] = None) -> str:
+    # Client-supplied ids become file names, so only accept plain ones.
+    if value and re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", value) and not value.startswith("."):
+        return value
+    return uuid.uuid4().hex
+
+@contextmanager
+def trace(rid: str, **info: Any) -> Iterator[None]:
+    """
+    Collects the spans of one request and dumps them as JSON to TRACE_DIR on exit.
+    """
+    if not TRACING or not TRACE_DIR:
+        yield
+        return
+    record = {"request_id": rid, **info, "started": time.time(), "t0": time.perf_counter(), "spans": []}
+    token = _trace.set(record)
+    try:
+        yield
+    finally:
+        try:
+            _trace.reset(token)
+        except ValueError:
+            pass  # finished from another context (e.g. a closed stream); nothing to restore
+        # Spans still running in abandoned tasks may append after this; dump a copy.
+        dump = {key: value for key, value in record.items() if key != "t0"}
+        dump["seconds"] = time.perf_counter() - record["t0"]
+        dump["spans"] = sorted(record["spans"], key=lambda s: s["start"])
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            with open(os.path.join(TRACE_DIR, f"{rid}.json"), "w", encoding="utf-8") as f:
+                json.dump(dump, f, default=str)
+        except OSError as e:
+            print(f"Failed to write trace {rid}: {e}")
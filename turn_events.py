@@ -0,0 +1,52 @@
+import json
+import asyncio
+import contextvars
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional
+
+# Queue of the turn being streamed, if any. Set per task, so concurrent turns never mix
+# and code running outside a streamed turn pays one lookup per emit().
+_events: contextvars.ContextVar[Optional[asyncio.Queue]] = contextvars.ContextVar("turn_events", default=None)
+_DONE = object()
+
+def emit(event: str, **data: Any) -> None:
+    """
+    Reports progress of the current turn to its stream. A no-op when nobody is listening.
+    """
+    queue = _events.get()
+    if queue is not None:
+        queue.put_nowait({"event": event, **data})
+
+async def stream(turn: Awaitable[Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs a turn and yields the events it emits as they happen, then a final "done" event
+    with the turn's result (or an "error" event). Closing the iterator cancels the turn.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        _events.set(queue)
+        try:
+            return await turn
+        finally:
+            queue.put_nowait(_DONE)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event = await queue.get()
+            if event is _DONE:
+                break
+            yield event
+        try:
+            yield {"event": "done", "result": task.result()}
+        except Exception as e:
+            yield {"event": "error", "error": str(e)}
+    finally:
+        if not task.done():
+            task.cancel()
+
+def sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+def ndjson(event: Dict[str, Any]) -> str:
+    return json.dumps(event, default=str) + "\n"